@@ -1,20 +1,22 @@
 # Admin_Login.py
 
-import subprocess
+import os
 from tkinter import messagebox
-import bcrypt
 import customtkinter as ctk
-import sqlite3
+from credentials import CredentialService
+from gui_tasks import TaskRunner
+from sessions import SESSION_ENV_VAR, SessionManager, token_from_environment
 from Admin_Page import AdminPage, AppAdmin, DatabaseHandler
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
-class App(ctk.CTk):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.title("ADMIN")
-        self.geometry("400x400")
+class AdminLoginFrame(ctk.CTkFrame):
+    # The admin login screen. It runs in its own window (App below) or as a screen inside
+    # the main interface; on_login(session_token) decides what happens after a login.
+    def __init__(self, master, session_token=None, on_login=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_login = on_login or self.open_admin_page
 
         label = ctk.CTkLabel(self, text="Admin LOGIN")
         label.pack(pady=20)
@@ -35,38 +37,69 @@ class App(ctk.CTk):
         button.pack(pady=12, padx=10)
 
         self.db_handler = DatabaseHandler()
-
-        def get_admin_credentials():
-            conn = sqlite3.connect('bank_database.db')
-            cursor = conn.cursor()
-            cursor.execute("SELECT username, password FROM admins LIMIT 1")
-            admin_data = cursor.fetchone()
-            conn.close()
-
-            if admin_data:
-                return admin_data
+        self.credentials = CredentialService()
+        # Database and bcrypt work runs off the Tk thread so the window stays responsive
+        self.task_runner = TaskRunner(self)
+        self.login_task = None
+        self.sessions = SessionManager(self.db_handler.pool.connection)
+
+        def check_login(entered_username, entered_password):
+            # Admins live in bankapp.db, the same database the terminal app uses; the
+            # default admin is created there if it is missing (only hashes if missing)
+            conn = self.db_handler.conn
+            self.credentials.ensure_admin(conn)
+            return self.credentials.verify_admin(conn, entered_username, entered_password)
+
+        def on_login_checked(success):
+            if success:
+                # Later screens (and windows started from here) reuse this session
+                session_token = self.sessions.issue("admin", "admin")
+                os.environ[SESSION_ENV_VAR] = session_token
+                # The screen may be shown again later, so don't leave the password behind
+                user_pass.delete(0, "end")
+                messagebox.showinfo("Login Successful", "Welcome, Admin!")
+                self.on_login(session_token)
             else:
-                return None
+                messagebox.showerror("Login Failed", "Invalid username or password. Please try again.")
+
+        def on_login_error(error):
+            messagebox.showerror("Login Failed", f"Could not check the admin details: {error}")
 
         def login(username_entry, password_entry):
-            entered_username = username_entry
-            entered_password = password_entry
+            # A new attempt replaces one that is still being checked
+            if self.login_task is not None:
+                self.login_task.cancel()
+            self.login_task = self.task_runner.submit(
+                check_login, username_entry, password_entry,
+                on_success=on_login_checked, on_error=on_login_error, busy_widgets=(button,),
+            )
+
+        # An admin session handed down by the main interface skips the password check
+        if session_token and self.sessions.verify(session_token, role="admin"):
+            self.after(0, self.on_login, session_token)
+
+    # Function to open the admin page in a window of its own (used when running standalone)
+    def open_admin_page(self, session_token):
+        try:
+            admin_page = AdminPage(self.db_handler)
+            app_admin = AppAdmin(admin_page)
+            app_admin.mainloop()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open Admin Page: {e}")
+
+    def destroy(self):
+        self.task_runner.shutdown()
+        super().destroy()
 
-            admin_credentials = get_admin_credentials()
-            if admin_credentials and entered_username == admin_credentials[0] and bcrypt.checkpw(entered_password.encode("utf-8"), admin_credentials[1].encode("utf-8")):
-                messagebox.showinfo("Login Successful", "Welcome, Admin!")
-                open_admin_page(self.db_handler)
-            else:
-                messagebox.showerror("Login Failed", "Invalid username or password. Please try again.")
+class App(ctk.CTk):
+    def __init__(self, *args, session_token=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.title("ADMIN")
+        self.geometry("400x400")
 
-        def open_admin_page(db_handler):
-            try:
-                admin_page = AdminPage(db_handler)
-                app_admin = AppAdmin(admin_page)
-                app_admin.mainloop()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to open Admin Page: {e}")
+        self.login_frame = AdminLoginFrame(self, session_token=session_token, fg_color="transparent")
+        self.login_frame.pack(fill="both", expand=True)
 
 if __name__ == "__main__":
-    app = App()
+    app = App(session_token=token_from_environment())
     app.mainloop()
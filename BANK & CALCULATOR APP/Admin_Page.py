@@ -1,76 +1,203 @@
 # Admin_Page.py
 
+import re
 import sqlite3
 from tkinter import messagebox
 import customtkinter as ctk
+from account_removal import AccountRemover
+from db_access import get_pool
+from money import format_cents
+from schema_migrations import migrate
+from virtual_table import VirtualTable
 
 ctk.set_appearance_mode("dark")
 
+# Columns the user list can be sorted by (each has an index that starts with it)
+USER_SORT_COLUMNS = ("account_number", "username", "balance_cents")
+
+# Counts of users per search are cached; past this many searches the cache starts over
+USER_COUNT_CACHE_SIZE = 64
+
+# Function to turn a search prefix into a condition that can use the indexes.
+# Prefixes are matched as ranges (prefix <= value < next prefix) rather than LIKE.
+def user_search_filter(search):
+    search = (search or "").strip()
+    if not search:
+        return "", ()
+    upper = search[:-1] + chr(ord(search[-1]) + 1)
+    if search.isdigit():
+        return (
+            "((username >= ? AND username < ?) OR (account_number >= ? AND account_number < ?))",
+            (search, upper, search, upper),
+        )
+    return "username >= ? AND username < ?", (search, upper)
+
+# Function to check a user against a search prefix the same way user_search_filter does
+def user_matches_search(account_number, username, search):
+    search = (search or "").strip()
+    if not search:
+        return True
+    if str(username or "").startswith(search):
+        return True
+    return search.isdigit() and str(account_number).startswith(search)
+
 class DatabaseHandler:
-    def __init__(self, db_file="bankapp.db"):
+    # With archive_ledger on, removing users wakes a background LedgerArchiver (started on
+    # the first removal), so the closed accounts' ledger rows leave the live tables soon
+    # after rather than waiting for some other process to archive them.
+    def __init__(self, db_file="bankapp.db", archive_ledger=True):
+        self.db_file = db_file
+        self.archive_ledger = archive_ledger
+        self.ledger_archiver = None
+        # Users matching each recent search; kept up to date from what removals report
+        self.user_counts = {}
         try:
-            self.conn = sqlite3.connect(db_file)
-            self.cursor = self.conn.cursor()
+            self.pool = get_pool(db_file)
             self.create_tables()
         except sqlite3.Error as e:
             print(f"Error connecting to the database: {e}")
             raise  # Raise the exception to indicate the failure
 
+    # Each thread works on its own pooled connection
+    @property
+    def conn(self):
+        return self.pool.connection()
+
     def create_tables(self):
         try:
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS accounts (
-                    account_number TEXT PRIMARY KEY,
-                    username TEXT,
-                    password TEXT,
-                    balance REAL
-                )
-            ''')
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS admins (
-                    id INTEGER PRIMARY KEY,
-                    username TEXT UNIQUE,
-                    password TEXT
-                )
-            ''')
-            self.conn.commit()
-            print("Tables created successfully")
+            # Create or upgrade the tables to the current schema version
+            migrate(self.conn)
         except sqlite3.Error as e:
             print(f"Error creating tables: {e}")
             raise  # Raise the exception to indicate the failure
 
     def get_all_users(self):
         try:
-            self.cursor.execute("SELECT account_number, username, balance FROM accounts")
-            return self.cursor.fetchall()
+            rows = self.conn.execute("SELECT account_number, username, balance_cents FROM accounts").fetchall()
+            return [tuple(row) for row in rows]
         except sqlite3.Error as e:
             print(f"Error executing SELECT query: {e}")
             messagebox.showerror("Database Error", f"Error fetching users: {e}")
             raise  # Raise the exception to indicate the failure
 
-    def remove_user(self, account_number):
-        try:
-            # Check if the account number exists before attempting to remove
-            self.cursor.execute("SELECT * FROM accounts WHERE account_number=?", (account_number,))
-            existing_user = self.cursor.fetchone()
-
-            if existing_user:
-                # Account number exists, proceed with removal
-                self.cursor.execute("DELETE FROM accounts WHERE account_number=?", (account_number,))
-                self.conn.commit()
-                print(f"User with account number {account_number} has been removed successfully.")
-                messagebox.showinfo("User Removed", f"User with account number {account_number} has been removed successfully.")
+    # Function to count the users matching a search prefix (all users if it is empty).
+    # Counts are cached per search, so refreshing or re-typing a search does not count again.
+    def count_users(self, search=""):
+        search = (search or "").strip()
+        if search not in self.user_counts:
+            if len(self.user_counts) >= USER_COUNT_CACHE_SIZE:
+                self.user_counts.clear()
+            condition, params = user_search_filter(search)
+            where = f"WHERE {condition}" if condition else ""
+            self.user_counts[search] = self.conn.execute(f"SELECT COUNT(*) FROM accounts {where}", params).fetchone()[0]
+        return self.user_counts[search]
+
+    # Function to drop the cached counts, e.g. when users may have been added elsewhere
+    def forget_user_counts(self):
+        self.user_counts = {}
+
+    # Function to apply removed (-1) or restored (+1) users to the cached counts
+    def adjust_user_counts(self, rows, sign):
+        for search in self.user_counts:
+            changed = sum(1 for account_number, username, _ in rows if user_matches_search(account_number, username, search))
+            self.user_counts[search] = max(0, self.user_counts[search] + sign * changed)
+
+    # Function to fetch one window of the user list, sorted and filtered in the database.
+    # Windows are found by seeking from a row's key, (sort value, account number), instead
+    # of OFFSET, so the cost does not grow with how far down the list the window is:
+    #   seek      - the key to start from; None starts at the first row (last row if backward)
+    #   backward  - walk towards the start of the list; rows still come back in list order
+    #   skip      - rows to step over past the key before the window starts
+    #   inclusive - the row at the key itself is part of the window
+    def fetch_users(self, limit, sort_column="account_number", descending=False, search="",
+                    seek=None, backward=False, skip=0, inclusive=False):
+        if sort_column not in USER_SORT_COLUMNS:
+            raise ValueError(f"Cannot sort users by {sort_column}")
+        condition, params = user_search_filter(search)
+        conditions = [condition] if condition else []
+        # Walking backward reads the list in the opposite order
+        reverse = descending != backward
+        direction = "DESC" if reverse else "ASC"
+        if seek is not None:
+            operator = ("<" if reverse else ">") + ("=" if inclusive else "")
+            if sort_column == "account_number":
+                conditions.append(f"account_number {operator} ?")
+                params += (seek[1],)
             else:
-                # Account number not found in the database
-                print(f"User with account number {account_number} not found in the database.")
-                messagebox.showerror("User Not Found", f"User with account number {account_number} not found in the database.")
+                conditions.append(f"({sort_column}, account_number) {operator} (?, ?)")
+                params += tuple(seek)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # Account numbers are unique, so they break ties and keep the order stable
+        order_by = f"{sort_column} {direction}"
+        if sort_column != "account_number":
+            order_by += f", account_number {direction}"
+        rows = self.conn.execute(
+            f"SELECT account_number, username, balance_cents FROM accounts {where} "
+            f"ORDER BY {order_by} LIMIT ? OFFSET ?",
+            params + (limit, skip),
+        ).fetchall()
+        rows = [tuple(row) for row in rows]
+        if backward:
+            rows.reverse()
+        return rows
+
+    # Function to remove several users at once. Accounts are closed rather than deleted and
+    # their ledger rows are archived later by ledger_archive.LedgerArchiver.
+    # Returns (removed [(account_number, username, balance_cents)], account numbers not found).
+    def remove_users(self, account_numbers):
+        try:
+            removed, missing = AccountRemover(self.conn).remove_accounts(account_numbers)
+        except sqlite3.Error as e:
+            print(f"Error removing users: {e}")
+            messagebox.showerror("Database Error", f"Error removing users: {e}")
+            raise  # Raise the exception to indicate the failure
+        if removed:
+            self.adjust_user_counts(removed, -1)
+            self.wake_ledger_archiver()
+        return removed, missing
+
+    # Function to have the removed accounts' ledger rows archived now
+    def wake_ledger_archiver(self):
+        if not self.archive_ledger:
+            return
+        if self.ledger_archiver is None:
+            # Imported here: the archiver is only needed once someone has been removed
+            from ledger_archive import LedgerArchiver
+            self.ledger_archiver = LedgerArchiver(self.db_file)
+            # Starting runs a first pass straight away
+            self.ledger_archiver.start()
+        else:
+            self.ledger_archiver.wake()
+
+    # Function to stop the background archiver, if one was started
+    def close(self):
+        if self.ledger_archiver is not None:
+            self.ledger_archiver.close()
+            self.ledger_archiver = None
 
-            # Return the updated list of users after the deletion
-            return self.get_all_users()
+    # Function to reopen removed users' accounts; returns (restored rows, not found)
+    def restore_users(self, account_numbers):
+        try:
+            restored, missing = AccountRemover(self.conn).restore_accounts(account_numbers)
         except sqlite3.Error as e:
-            print(f"Error removing user: {e}")
-            messagebox.showerror("Database Error", f"Error removing user: {e}")
+            print(f"Error restoring users: {e}")
+            messagebox.showerror("Database Error", f"Error restoring users: {e}")
             raise  # Raise the exception to indicate the failure
+        self.adjust_user_counts(restored, 1)
+        return restored, missing
+
+    def remove_user(self, account_number):
+        removed, _ = self.remove_users([account_number])
+        if removed:
+            print(f"User with account number {account_number} has been removed successfully.")
+            messagebox.showinfo("User Removed", f"User with account number {account_number} has been removed successfully.")
+        else:
+            # Account number not found in the database
+            print(f"User with account number {account_number} not found in the database.")
+            messagebox.showerror("User Not Found", f"User with account number {account_number} not found in the database.")
+
+        # Only the removed rows are returned; callers refresh just what they show
+        return removed
 
 class AdminPage:
     def __init__(self, db_handler):
@@ -79,48 +206,85 @@ class AdminPage:
     def view_all_users(self):
         return self.db_handler.get_all_users()
 
+    def count_users(self, search=""):
+        return self.db_handler.count_users(search)
+
+    def forget_user_counts(self):
+        self.db_handler.forget_user_counts()
+
+    def fetch_users(self, limit, sort_column="account_number", descending=False, search="", **seek):
+        return self.db_handler.fetch_users(limit, sort_column, descending, search, **seek)
+
     def remove_user(self, account_number):
         return self.db_handler.remove_user(account_number)
 
-class AppAdmin(ctk.CTk):
-    def __init__(self, admin_page, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.title("ADMIN HOMEPAGE")
-        self.geometry("600x300")
-
-        # Set background color to black
-        self.configure(bg="black")
+    def remove_users(self, account_numbers):
+        return self.db_handler.remove_users(account_numbers)
 
+class AdminPageFrame(ctk.CTkFrame):
+    # The admin homepage. It runs in its own window (AppAdmin below) or as a screen inside
+    # the main interface; on_logout() decides what happens after the admin logs out.
+    def __init__(self, master, admin_page, on_logout=None, **kwargs):
+        super().__init__(master, **kwargs)
         self.admin_page = admin_page
+        self.on_logout = on_logout or self.winfo_toplevel().destroy
+
+        self.search_text = ""
+        self.search_job = None
 
-        self.accountNumberEntry = ctk.CTkEntry(self)
-        self.accountNumberEntry.grid(row=4, column=0, padx=20, pady=20, sticky="ew")
+        self.searchEntry = ctk.CTkEntry(self, placeholder_text="Search username or account number")
+        self.searchEntry.grid(row=0, column=0, columnspan=3, padx=20, pady=(20, 10), sticky="ew")
+        self.searchEntry.bind("<KeyRelease>", self.on_search_typed)
+
+        # Only the visible rows are fetched and drawn; see virtual_table.VirtualTable
+        self.userTable = VirtualTable(
+            self,
+            columns=[("account_number", "Account Number", 160), ("username", "Username", 200), ("balance_cents", "Balance", 140)],
+            count_rows=lambda: self.admin_page.count_users(self.search_text),
+            fetch_rows=lambda limit, sort_column, descending, **seek: self.admin_page.fetch_users(
+                limit, sort_column, descending, self.search_text, **seek
+            ),
+            formatters={"balance_cents": lambda balance: f"R{format_cents(balance)}"},
+        )
+        self.userTable.grid(row=1, column=0, columnspan=3, padx=20, pady=10, sticky="nsew")
+        self.userTable.tree.bind("<<TreeviewSelect>>", self.on_user_selected)
+
+        self.accountNumberEntry = ctk.CTkEntry(self, placeholder_text="Account number(s)")
+        self.accountNumberEntry.grid(row=2, column=0, padx=20, pady=10, sticky="ew")
 
         self.removeUserButton = ctk.CTkButton(self, text="Remove User", command=self.remove_user_button_click)
-        self.removeUserButton.grid(row=4, column=1, padx=20, pady=20, sticky="ew")
+        self.removeUserButton.grid(row=2, column=1, padx=20, pady=10, sticky="ew")
 
         self.viewAllUsersButton = ctk.CTkButton(self, text="View All Users", command=self.view_all_users_button_click)
-        self.viewAllUsersButton.grid(row=6, column=0, padx=20, pady=20, sticky="ew")
+        self.viewAllUsersButton.grid(row=3, column=0, padx=20, pady=(10, 20), sticky="ew")
 
         self.logoutButton = ctk.CTkButton(self, text="Logout", command=self.logout_button_click)
-        self.logoutButton.grid(row=6, column=2, padx=20, pady=20, sticky="ew")
+        self.logoutButton.grid(row=3, column=2, padx=20, pady=(10, 20), sticky="ew")
+
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure((0, 1, 2), weight=1)
 
-        self.displayBox = ctk.CTkTextbox(self, width=200, height=100)
-        self.displayBox.grid(row=7, column=0, columnspan=4, padx=20, pady=20, sticky="nsew")
+        self.view_all_users_button_click()
 
     def remove_user_button_click(self):
-        print("Remove User button clicked.")
-        account_number = self.accountNumberEntry.get()
-        print(f"Account number entered: {account_number}")
-        if account_number.strip() != "":
+        # Several account numbers can be removed at once, separated by spaces or commas
+        account_numbers = [number for number in re.split(r"[\s,]+", self.accountNumberEntry.get()) if number]
+        if account_numbers:
             try:
-                # Fetch the updated list of users after the removal
-                updated_users = self.admin_page.remove_user(account_number)
+                if len(account_numbers) == 1:
+                    self.admin_page.remove_user(account_numbers[0])
+                else:
+                    removed, missing = self.admin_page.remove_users(account_numbers)
+                    summary = f"Removed {len(removed)} user(s)."
+                    if missing:
+                        summary += f" Not found: {', '.join(missing[:10])}" + (" ..." if len(missing) > 10 else "")
+                    print(summary)
+                    messagebox.showinfo("Users Removed", summary)
 
                 self.accountNumberEntry.delete(0, "end")  # Clear the entry after removal
 
-                # Display the updated list of users in the console
-                print(f"Updated users: {updated_users}")
+                # Only the visible window is re-read; the scroll position stays where it was
+                self.userTable.refresh()
             except Exception as e:
                 print(f"Error removing user: {e}")
                 messagebox.showerror("Error", f"An error occurred while removing the user. Please check the console for details.")
@@ -128,28 +292,61 @@ class AppAdmin(ctk.CTk):
             messagebox.showerror("Error", "Invalid account number. Please try again.")
 
     def view_all_users_button_click(self):
-        print("View All Users button clicked.")
         try:
-            # Fetch the current list of users
-            users = self.admin_page.view_all_users()
-            print(f"Retrieved users: {users}")
-            self.displayBox.delete("1.0", "end")
-
-            if users:
-                for user in users:
-                    user_info = f"Account Number: {user[0]}, Username: {user[1]}, Balance: R{user[2]:.2f}\n"
-                    self.displayBox.insert("end", user_info)
-            else:
+            self.searchEntry.delete(0, "end")
+            self.search_text = ""
+            # An explicit refresh counts again, picking up accounts opened elsewhere
+            self.admin_page.forget_user_counts()
+            self.userTable.refresh(reset=True)
+            if self.userTable.total == 0:
                 messagebox.showinfo("No Users", "There are no users in the database.")
         except Exception as e:
             print(f"Error in view_all_users_button_click: {e}")
             messagebox.showerror("Error", f"An error occurred while fetching users. Please check the console for details.")
 
+    # Search runs as the admin types, once typing pauses for a moment
+    def on_search_typed(self, event):
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(150, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        search_text = self.searchEntry.get().strip()
+        if search_text == self.search_text:
+            return
+        self.search_text = search_text
+        try:
+            self.userTable.refresh(reset=True)
+        except Exception as e:
+            print(f"Error searching users: {e}")
+            messagebox.showerror("Error", f"An error occurred while searching users. Please check the console for details.")
+
+    # Selecting a row fills in its account number, ready for removal
+    def on_user_selected(self, event):
+        row = self.userTable.selected_row()
+        if row:
+            self.accountNumberEntry.delete(0, "end")
+            self.accountNumberEntry.insert(0, row[0])
+
     def logout_button_click(self):
         result = messagebox.askyesno("Logout", "Are you sure you want to logout?")
         if result:
             print("Admin logout successful.")
-            self.destroy()
+            self.on_logout()
+
+class AppAdmin(ctk.CTk):
+    def __init__(self, admin_page, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.title("ADMIN HOMEPAGE")
+        self.geometry("640x480")
+
+        # Set background color to black
+        self.configure(bg="black")
+
+        self.admin_page = admin_page
+        self.page = AdminPageFrame(self, admin_page, on_logout=self.destroy, fg_color="transparent")
+        self.page.pack(fill="both", expand=True)
 
 if __name__ == "__main__":
     try:
@@ -157,6 +354,7 @@ if __name__ == "__main__":
         admin_page = AdminPage(db_handler)
         app_admin = AppAdmin(admin_page)
         app_admin.mainloop()
+        db_handler.close()
     except Exception as e:
         print(f"Unhandled exception: {e}")
         messagebox.showerror("Error", f"An unexpected error occurred: {e}")
@@ -1,13 +1,27 @@
 # -*- coding: utf-8 -*-
 import sqlite3
-import bcrypt
-import random
-import string
 import math
+import os
 import re
+import threading
 from datetime import datetime
-import tkinter as tk
-from tkinter import messagebox
+from account_numbers import AccountNumberAllocator
+from account_registry import AccountRegistry
+from account_removal import AccountRemover
+import amortization
+from audit_log import AuditLogWriter
+from balance_engine import BalanceEngine, BalanceReconciler
+from credentials import CredentialService
+from db_access import get_pool
+from ledger_archive import LedgerArchiver
+from login_throttle import LoginThrottle
+from money import CENTS_PER_RAND, Money, parse_rands
+from posting_engine import TRANSFER_IN, TRANSFER_OUT, GroupCommitter, PostingEngine
+from quote_cache import get_quote_cache
+from schema_migrations import migrate
+from sessions import SESSION_ENV_VAR, SessionManager, token_from_environment
+from transaction_history import DEFAULT_PAGE_SIZE, TransactionHistory
+from transfers import TransferEngine
 
 
 # Welcome text
@@ -66,58 +80,119 @@ CLOSE_TEXT = """
 
 """
 class BankDatabase:
-    def __init__(self, db_name="bankapp.db"):
-        try:
-            self.conn = sqlite3.connect(db_name, detect_types=sqlite3.PARSE_DECLTYPES)
-            self.conn.row_factory = sqlite3.Row  # Set row_factory for named columns
-            self.cursor = self.conn.cursor()
-            self.create_tables()
-            self.create_admin(
-                self.cursor, self.conn
-            )  # Create admin user on initialization
-        except sqlite3.Error as e:
-            print("Database connection error:", e)
+    def __init__(self, db_name="bankapp.db", group_commit=False, archive_ledger=False,
+                 reconcile_balances=False):
+        self.db_name = db_name
+        self.group_commit = group_commit
+        self.archive_ledger = archive_ledger
+        self.reconcile_balances = reconcile_balances
+        # Started on the first logged transaction, like the database below
+        self.audit_log_writer = None
+        self.group_committer = None
+        self.ledger_archiver = None
+        self.balance_reconciler = None
+        # The database is opened, migrated and seeded on first use rather than here, so the
+        # menu is on screen before any DDL (or admin password hashing) runs
+        self.pool = None
+        self.open_lock = threading.Lock()
+        self.credentials = CredentialService()
+        self.login_throttle = LoginThrottle(lambda: self.conn)
+        self.sessions = SessionManager(lambda: self.conn)
+        self.session_token = None
+        # Idempotency keys of transfers already logged and confirmed in this session
+        self.reported_transfers = set()
+
+    # Function to open the database the first time it is needed
+    def open_database(self):
+        with self.open_lock:
+            if self.pool is not None:
+                return
+            try:
+                # Connections come from the shared pool; rows have named columns
+                pool = get_pool(self.db_name)
+                # Create or upgrade the tables, then create the admin user (only hashes if missing)
+                migrate(pool.connection())
+                self.credentials.ensure_admin(pool.connection())
+                # With group commit on, postings from all callers share one background writer
+                if self.group_commit:
+                    self.group_committer = GroupCommitter(self.db_name)
+                # With archiving on, closed-account and old ledger rows move to the archive in the background
+                if self.archive_ledger:
+                    self.ledger_archiver = LedgerArchiver(self.db_name)
+                    self.ledger_archiver.start()
+                # With reconciliation on, balances are checked against the ledger in the background
+                if self.reconcile_balances:
+                    self.balance_reconciler = BalanceReconciler(self.db_name)
+                    self.balance_reconciler.start()
+                self.pool = pool
+            except sqlite3.Error as e:
+                print("Database connection error:", e)
+                raise
+
+    # Each thread works on its own pooled connection
+    @property
+    def conn(self):
+        if self.pool is None:
+            self.open_database()
+        return self.pool.connection()
+
+    # The audit log writer thread (and its file) are only set up when something is logged
+    @property
+    def audit_log(self):
+        with self.open_lock:
+            if self.audit_log_writer is None:
+                self.audit_log_writer = AuditLogWriter("transaction_log.txt")
+            return self.audit_log_writer
+
+    @property
+    def posting_engine(self):
+        conn = self.conn  # Opens the database (and starts group commit) if needed
+        if self.group_committer is not None:
+            return self.group_committer
+        return PostingEngine(conn)
+
+    @property
+    def transfer_engine(self):
+        return TransferEngine(self.conn)
+
+    @property
+    def account_registry(self):
+        return AccountRegistry(self.conn)
+
+    @property
+    def account_number_allocator(self):
+        return AccountNumberAllocator(self.conn)
 
     def create_tables(self):
-        # Create necessary tables if they don't exist
-        self.cursor.execute(
-            """CREATE TABLE IF NOT EXISTS users
-                              (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password TEXT, 
-                              balance REAL, account_number TEXT UNIQUE)"""
-        )
-        self.cursor.execute(
-            """CREATE TABLE IF NOT EXISTS transactions
-                              (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, transaction_type TEXT, 
-                              amount REAL, transaction_time DATETIME)"""
-        )
-        self.cursor.execute(
-            """CREATE TABLE IF NOT EXISTS admins
-                              (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password TEXT)"""
-        )
-        self.conn.commit()
+        # Create or upgrade the tables to the current schema version
+        migrate(self.conn)
 
     def close_connection(self):
-        # Close the database connection
-        self.conn.close()
-
-    # Function to fetch user transactions from the database
-    def fetch_user_transactions(self, username):
-        # Execute a database query to fetch transactions for the given username
-        self.cursor.execute("SELECT * FROM transactions WHERE username=?", (username,))
-        transactions = self.cursor.fetchall()
-
-        # Prepare a list of dictionaries containing transaction data
-        transaction_list = []
-        for transaction in transactions:
-            transaction_data = {
-                "transaction_type": transaction["transaction_type"],
-                "amount": transaction["amount"],
-                "transaction_time": transaction["transaction_time"],
-            }
-            transaction_list.append(transaction_data)
-
-        # Return the list of user transactions
-        return transaction_list
+        # Flush queued postings, then close the database connection
+        if self.group_committer is not None:
+            self.group_committer.close()
+        if self.ledger_archiver is not None:
+            self.ledger_archiver.close()
+        if self.balance_reconciler is not None:
+            self.balance_reconciler.close()
+        if self.audit_log_writer is not None:
+            self.audit_log_writer.close()
+        if self.pool is not None:
+            self.pool.close()
+
+    # Function to fetch user transactions from the database, one page at a time
+    def fetch_user_transactions(self, account_id, page_size=DEFAULT_PAGE_SIZE,
+                                start_time=None, end_time=None, transaction_types=None,
+                                include_archived=False):
+        # Returns a lazy history; iterate it for transactions or call pages() for lists
+        return TransactionHistory(
+            self.conn, account_id, page_size, start_time, end_time, transaction_types, include_archived
+        )
+
+    # Function to check an account's stored balance against its ledger (only the rows
+    # since its last checkpoint are summed)
+    def verify_balance(self, account_id):
+        return BalanceEngine(self.conn).verify(account_id)
 
     # Function to get float input from user
     def get_float_input(self, prompt):
@@ -138,10 +213,9 @@ class BankDatabase:
                 # Handle the case where the user enters invalid input (not a number)
                 print("Invalid input. Please enter a valid numeric value.")
 
-# Function to generate a random account number
+    # Function to allocate a new, guaranteed-unique account number
     def generate_random_account_number(self):
-        account_number = "".join(random.choices(string.digits, k=10))
-        return account_number
+        return self.account_number_allocator.allocate()
 
     # Function to validate the password
     def is_valid_password(self, password):
@@ -171,41 +245,22 @@ class BankDatabase:
 
         return True
 
-    # Function to handle user deposit
+    # Function to handle user deposit (amount in integer cents)
     def user_deposit(self, user, amount):
-        if amount >= 10 and amount % 10 == 0:
-            # Calculate the new balance after deposit
-            user_balance = user["balance"] + amount
-
-            # Update user's balance in the database
-            self.cursor.execute(
-                "UPDATE users SET balance=? WHERE account_number=?",
-                (user_balance, user["account_number"]),
-            )
-
-            # Get the current timestamp for the transaction
-            transaction_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            # Insert the deposit transaction into the transactions table
-            self.cursor.execute(
-                "INSERT INTO transactions (username, transaction_type, amount, transaction_time) VALUES (?, ?, ?, ?)",
-                (user["username"], "Deposit", amount, transaction_time),
-            )
-            self.conn.commit()
+        # At least R10, in whole multiples of R10
+        if amount >= 10 * CENTS_PER_RAND and amount % (10 * CENTS_PER_RAND) == 0:
+            # Apply the deposit atomically and get the new balance back from the database
+            updated_balance = self.posting_engine.post(user["account_number"], "Deposit", amount)
+            if updated_balance is None:
+                print("Account not found. Please log in again.")
+                return None
 
             # Log the deposit transaction
-            self.log_transaction(user["username"], "Deposit", amount, user_balance)
-
-            # Fetch the updated balance from the database
-            self.cursor.execute(
-                "SELECT balance FROM users WHERE account_number=?",
-                (user["account_number"],),
-            )
-            updated_balance = self.cursor.fetchone()[0]
+            self.log_transaction(user["username"], "Deposit", amount, updated_balance)
 
             # Print deposited amount and updated balance
-            print(f"Deposited: R{amount}")
-            print(f"Current Balance: R{updated_balance}")  # Display updated balance after deposit
+            print(f"Deposited: R{Money(amount)}")
+            print(f"Current Balance: R{Money(updated_balance)}")  # Display updated balance after deposit
             return amount
         else:
             # Print error message for invalid deposit amount
@@ -213,52 +268,24 @@ class BankDatabase:
                 "Invalid deposit amount. Please enter an amount above or equal to 10 and in multiples of 10."
             )
             return None
-    # Function to handle user withdrawal
+    # Function to handle user withdrawal (amount in integer cents)
     def user_withdraw(self, user, amount):
-        if amount >= 60 and amount % 10 == 0:
+        # At least R60, in whole multiples of R10
+        if amount >= 60 * CENTS_PER_RAND and amount % (10 * CENTS_PER_RAND) == 0:
             try:
-                # Fetch the user's current balance from the database
-                self.cursor.execute(
-                    "SELECT balance FROM users WHERE username=?", (user["username"],)
-                )
-                user_balance = self.cursor.fetchone()[0]
-
-                # Check if the user has sufficient balance for the withdrawal
-                if user_balance >= amount:
-                    # Calculate the new balance after withdrawal
-                    new_balance = user_balance - amount
-
-                    # Update user's balance in the database
-                    self.cursor.execute(
-                        "UPDATE users SET balance=? WHERE username=?",
-                        (new_balance, user["username"]),
-                    )
-
-                    # Get the current timestamp for the transaction
-                    transaction_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                    # Insert the withdrawal transaction into the transactions table
-                    self.cursor.execute(
-                        "INSERT INTO transactions (username, transaction_type, amount, transaction_time) VALUES (?, ?, ?, ?)",
-                        (user["username"], "Withdrawal", amount, transaction_time),
-                    )
-                    self.conn.commit()
+                # Debit the account only if it still holds enough money; the check and the
+                # update are a single statement so concurrent withdrawals cannot overdraw it
+                updated_balance = self.posting_engine.post(user["account_number"], "Withdrawal", amount)
 
+                if updated_balance is not None:
                     # Log the withdrawal transaction
                     self.log_transaction(
-                        user["username"], "Withdrawal", amount, new_balance
+                        user["username"], "Withdrawal", amount, updated_balance
                     )
 
-                    # Fetch the updated balance from the database
-                    self.cursor.execute(
-                        "SELECT balance FROM users WHERE username=?",
-                        (user["username"],),
-                    )
-                    updated_balance = self.cursor.fetchone()[0]
-
                     # Print withdrawn amount and updated balance
-                    print(f"Withdrawn: R{amount}")
-                    print(f"Current Balance: R{updated_balance}")  # Display updated balance after withdrawal
+                    print(f"Withdrawn: R{Money(amount)}")
+                    print(f"Current Balance: R{Money(updated_balance)}")  # Display updated balance after withdrawal
                     return amount
                 else:
                     # Print error message for insufficient balance
@@ -274,29 +301,64 @@ class BankDatabase:
             )
             return None
 
+    # Function to transfer money (integer cents) from the user's account to another account.
+    # Passing the same idempotency key again makes a retry safe; one is made if not given.
+    def user_transfer(self, user, to_account_number, amount, idempotency_key=None):
+        if amount <= 0:
+            print("Invalid transfer amount. Please enter a positive value.")
+            return None
+        if to_account_number == user["account_number"]:
+            print("You cannot transfer money to your own account.")
+            return None
+        try:
+            balances = self.transfer_engine.transfer(
+                user["account_number"], to_account_number, amount, idempotency_key
+            )
+        except sqlite3.Error as e:
+            print("Database error:", e)
+            return None
+        if balances is None:
+            print("Transfer failed: the account was not found or your balance is too low.")
+            return None
+
+        from_balance, to_balance, replayed = balances
+        # A retry of a transfer that was already logged and confirmed is not reported again;
+        # one that went through without this session hearing back (e.g. the commit landed
+        # but the reply was an error) is reported now
+        if not replayed or idempotency_key not in self.reported_transfers:
+            # Both legs are logged, so the log matches the ledger
+            recipient = self.conn.execute(
+                "SELECT username FROM accounts WHERE account_number=?", (to_account_number,)
+            ).fetchone()
+            self.log_transaction(user["username"], TRANSFER_OUT, amount, from_balance)
+            self.log_transaction(recipient[0] if recipient else to_account_number, TRANSFER_IN, amount, to_balance)
+            print(f"Transferred: R{Money(amount)} to account {to_account_number}")
+            print(f"Current Balance: R{Money(from_balance)}")
+            self.reported_transfers.add(idempotency_key)
+        return amount
+
     # Function to log transactions in transaction_log.txt file
-    def log_transaction(
-        self, username, transaction_type, amount, transaction_time, balance
-    ):
-        with open("transaction_log.txt", "a") as file:
-            log_entry = f"Username: {username}, Transaction Type: {transaction_type}, Amount: {amount}, Balance: {balance}, Time: {transaction_time}\n"
-            file.write(log_entry)
-        print("Transaction logged successfully.")
-
-    # Function to validate initial deposit amount input
+    def log_transaction(self, username, transaction_type, amount, balance):
+        # Queued for the background writer; the file is not touched on the posting path.
+        # Amounts are cents; the log shows them in rands.
+        self.audit_log.log(username, transaction_type, Money(amount), Money(balance))
+
+    # Function to validate initial deposit amount input; returns the amount in cents
     def validate_initial_deposit(self, input_value):
         try:
-            deposit_amount = float(input_value)
+            deposit_amount = parse_rands(input_value)
             if deposit_amount < 0:
                 print("Initial deposit amount cannot be negative. Please enter a valid amount.")
                 return None
             return deposit_amount
         except ValueError:
-            print("Invalid input. Please enter a valid numeric value for the deposit amount.")
+            print("Invalid input. Please enter an amount in rands, e.g. 150 or 150.50.")
             return None
 
     # Function to generate a random password
     def generate_random_password(self, length=12):
+        import random
+        import string
         characters = string.ascii_letters + string.digits + string.punctuation
         password = ''.join(random.choice(characters) for _ in range(length))
         return password
@@ -311,8 +373,9 @@ class BankDatabase:
                 print("Username cannot contain spaces. Please choose a different username.")
                 continue
 
-            self.cursor.execute("SELECT * FROM users WHERE username=?", (username,))
-            existing_user = self.cursor.fetchone()
+            existing_user = self.conn.execute(
+                "SELECT 1 FROM accounts WHERE username=?", (username,)
+            ).fetchone()
 
             if existing_user:
                 print("Username already in use. Please choose a different username.")
@@ -343,37 +406,31 @@ class BankDatabase:
             else:
                 print("Invalid choice! Please enter 'yes' or 'no'.")
 
-        # Hash the password before storing it in the database
-        hashed_password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-
         while True:
             initial_deposit_input = input("Enter initial deposit amount: R")
             initial_deposit = self.validate_initial_deposit(initial_deposit_input)
             if initial_deposit is not None:
                 break
 
-        hashed_password = bcrypt.hashpw(
-            password.encode("utf-8"), bcrypt.gensalt()
-        ).decode("utf-8")
+        # Hash the password (once) before storing it in the database
+        hashed_password = self.credentials.hash_password(password)
         account_number = self.generate_random_account_number()
 
-        # Store user data in the users table
-        self.cursor.execute(
-            "INSERT INTO users (username, password, balance, account_number) VALUES (?, ?, ?, ?)",
+        # Store user data in the accounts table
+        cursor = self.conn.execute(
+            "INSERT INTO accounts (username, password, balance_cents, account_number) VALUES (?, ?, ?, ?)",
             (username, hashed_password, initial_deposit, account_number),
         )
+        account_id = cursor.lastrowid
 
-        # Store user data in bankdata.txt
-        with open("bankdata.txt", "a") as bankdata_file:
-            bankdata_file.write(
-                f"Username: {username}, Account Number: {account_number}\n"
-            )
+        # Record the account in the registry (replaces the old bankdata.txt file)
+        self.account_registry.register(username, account_number)
 
         # Log initial deposit transaction in the transactions table
-        self.cursor.execute(
-            "INSERT INTO transactions (username, transaction_type, amount, transaction_time) VALUES (?, ?, ?, ?)",
+        self.conn.execute(
+            "INSERT INTO transactions (account_id, transaction_type, amount_cents, transaction_time) VALUES (?, ?, ?, ?)",
             (
-                username,
+                account_id,
                 "Initial Deposit",
                 initial_deposit,
                 datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -395,38 +452,39 @@ class BankDatabase:
             print("3. View Balance")
             print("4. View Transaction History")
             print("5. Financial Calculator")
-            print("6. Logout")
+            print("6. Transfer")
+            print("7. Logout")
             choice = input("Enter your choice: ")
 
             if choice == "1":
                 # Handle deposit functionality
-                deposit_amount = float(input("Enter deposit amount: R"))
+                deposit_amount = parse_rands(input("Enter deposit amount: R"))
                 if deposit_amount > 0:
                     deposited_amount = self.user_deposit(user_data, deposit_amount)
                     if deposited_amount is not None:
-                        user_row = self.cursor.execute(
-                            "SELECT * FROM users WHERE username=?",
-                            (user_data["username"],),
+                        user_row = self.conn.execute(
+                            "SELECT * FROM accounts WHERE id=?",
+                            (user_data["id"],),
                         ).fetchone()
                         user_data = dict(user_row)
-                        print(f"Deposited: R{deposited_amount}")
-                        print(f"Current Balance: R{user_data['balance']:.2f}")
+                        print(f"Deposited: R{Money(deposited_amount)}")
+                        print(f"Current Balance: R{Money(user_data['balance_cents'])}")
                 else:
                     print("Invalid deposit amount. Please enter a positive value.")
 
             elif choice == "2":
                 # Handle withdrawal functionality
-                withdrawal_amount = float(input("Enter withdrawal amount: R"))
+                withdrawal_amount = parse_rands(input("Enter withdrawal amount: R"))
                 if withdrawal_amount > 0:
                     withdrawn_amount = self.user_withdraw(user_data, withdrawal_amount)
-                    if isinstance(withdrawn_amount, float):
-                        user_row = self.cursor.execute(
-                            "SELECT * FROM users WHERE username=?",
-                            (user_data["username"],),
+                    if isinstance(withdrawn_amount, int):
+                        user_row = self.conn.execute(
+                            "SELECT * FROM accounts WHERE id=?",
+                            (user_data["id"],),
                         ).fetchone()
                         user_data = dict(user_row)
-                        print(f"Withdrawn: R{withdrawn_amount}")
-                        print(f"Current Balance: R{user_data['balance']:.2f}")
+                        print(f"Withdrawn: R{Money(withdrawn_amount)}")
+                        print(f"Current Balance: R{Money(user_data['balance_cents'])}")
                     else:
                         print(
                             withdrawn_amount
@@ -436,41 +494,72 @@ class BankDatabase:
 
             elif choice == "3":
                 # Display current balance
-                print(f"Current Balance: R{user_data['balance']:.2f}")
+                print(f"Current Balance: R{Money(user_data['balance_cents'])}")
 
             elif choice == "4":
                 # Handle viewing transaction history
-                transactions = self.fetch_user_transactions(user_data["username"])
+                # Older rows may already have been moved to the archive database
+                history = self.fetch_user_transactions(user_data["id"], include_archived=True)
                 print("\nTransaction History:")
-                for transaction in transactions:
-                    print(
-                        f"Type: {transaction['transaction_type']}, Amount: R{transaction['amount']:.2f}, Time: {transaction['transaction_time']}"
-                    )
+                for page in history.pages():
+                    for transaction in page:
+                        print(
+                            f"Type: {transaction['transaction_type']}, Amount: R{Money(transaction['amount_cents'])}, Time: {transaction['transaction_time']}"
+                        )
+                    # Only fetch the next page if the user asks for it
+                    if len(page) == history.page_size:
+                        if input("Press Enter for more, or 'q' to stop: ").lower() == "q":
+                            break
 
             elif choice == "5":
                 # Financial Calculator option
                 calculator.financial_calculator()
 
             elif choice == "6":
+                # Transfer to another account; debit and credit commit together
+                to_account_number = input("Enter the account number to transfer to: ").strip()
+                transfer_amount = parse_rands(input("Enter transfer amount: R"))
+                confirm = input(f"Transfer R{transfer_amount} to account {to_account_number}? (y/n): ")
+                if confirm.strip().lower() != "y":
+                    print("Transfer cancelled.")
+                    continue
+                # One key per confirmed transfer: retrying it can never move the money twice
+                # Imported here: only transfers need uuid
+                import uuid
+                idempotency_key = uuid.uuid4().hex
+                while self.user_transfer(user_data, to_account_number, transfer_amount, idempotency_key) is None:
+                    if input("Retry this transfer? (y/n): ").strip().lower() != "y":
+                        break
+                else:
+                    user_data = dict(self.conn.execute(
+                        "SELECT * FROM accounts WHERE id=?", (user_data["id"],)
+                    ).fetchone())
+
+            elif choice == "7":
                 # Logout the user and exit the loop
+                self.end_session()
                 print("Logout successful.")
                 break
 
             else:
                 print("Invalid choice! Please try again.")
 
-    # Function to handle admin actions
-    def handle_admin_actions(self):
+    # Function to handle admin actions. Everyone at this terminal looks the same, so there
+    # is no source to throttle by unless the caller has one; usernames are still throttled.
+    def handle_admin_actions(self, source=None):
         admin_username = input("Enter admin username: ")
         admin_password = input("Enter admin password: ")
 
-        # Authenticate admin
-        self.cursor.execute("SELECT * FROM admins WHERE username=?", (admin_username,))
-        admin_data = self.cursor.fetchone()
+        # Admin names are throttled separately from customer usernames
+        throttle_key = f"admin:{admin_username}"
+        wait = self.login_throttle.check(throttle_key, source)
+        if wait:
+            print(f"Too many login attempts. Please try again in {math.ceil(wait)} seconds.")
+            return
 
-        if admin_data and bcrypt.checkpw(
-                admin_password.encode("utf-8"), admin_data[2].encode("utf-8")
-        ):
+        # Authenticate admin
+        if self.credentials.verify_admin(self.conn, admin_username, admin_password):
+            self.login_throttle.record_success(throttle_key)
             print("Admin login successful!")
             while True:
                 print("\n1. Remove User")
@@ -479,15 +568,17 @@ class BankDatabase:
                 admin_choice = input("Enter your choice: ")
 
                 if admin_choice == "1":
-                    account_number = input("Enter account number to remove user: ")
-                    self.remove_user(account_number)
+                    # Several account numbers can be given, separated by spaces or commas
+                    account_numbers = re.split(r"[\s,]+", input("Enter account number(s) to remove: "))
+                    self.remove_users([number for number in account_numbers if number])
                 elif admin_choice == "2":
-                    self.cursor.execute("SELECT * FROM users")
-                    users = self.cursor.fetchall()
+                    users = self.conn.execute(
+                        "SELECT username, account_number, balance_cents FROM accounts"
+                    ).fetchall()
                     print("\nAll Users:")
                     for user in users:
                         print(
-                            f"Username: {user[1]}, Account Number: {user[4]}, Balance: R{user[3]}"
+                            f"Username: {user['username']}, Account Number: {user['account_number']}, Balance: R{Money(user['balance_cents'])}"
                         )
                 elif admin_choice == "3":
                     print("Admin logout successful.")
@@ -495,60 +586,146 @@ class BankDatabase:
                 else:
                     print("Invalid choice! Please try again.")
         else:
+            self.login_throttle.record_failure(throttle_key)
             print("Invalid admin credentials. Access denied.")
 
     # Function to remove user
     def remove_user(self, account_number):
-        self.cursor.execute(
-            "SELECT * FROM users WHERE account_number=?", (account_number,)
-        )
-        user_data = self.cursor.fetchone()
+        self.remove_users([account_number])
 
-        if user_data:
-            self.cursor.execute(
-                "DELETE FROM users WHERE account_number=?", (account_number,)
-            )
-            self.cursor.execute(
-                "DELETE FROM transactions WHERE username=?", (user_data[1],)
-            )
-            self.conn.commit()
+    # Function to remove several users at once. Accounts are closed rather than deleted
+    # (see restore_users) and their transactions are archived, not deleted.
+    def remove_users(self, account_numbers):
+        removed, missing = AccountRemover(self.conn).remove_accounts(account_numbers)
+        for account_number, _, _ in removed:
             print(
                 f"User with account number {account_number} has been removed successfully."
             )
-        else:
+        if missing:
+            print(f"Invalid account number(s): {', '.join(missing)}. Please try again.")
+        elif not removed:
             print("Invalid account number. Please try again.")
+        if removed and self.ledger_archiver is not None:
+            self.ledger_archiver.wake()
+        return removed, missing
 
-    # Function to handle user login
-    def login(self):
-        while True:
+    # Function to reopen removed users' accounts
+    def restore_users(self, account_numbers):
+        return AccountRemover(self.conn).restore_accounts(account_numbers)
+
+    # Function to handle user login (throttled per username, and per source if one is given)
+    def login(self, source=None, max_attempts=3):
+        for _ in range(max_attempts):
             username = input("Enter your username: ")
             password = input("Enter your password: ")
 
-            self.cursor.execute("SELECT * FROM users WHERE username=?", (username,))
-            user_data = self.cursor.fetchone()
+            # Refuse throttled or locked-out attempts before spending any bcrypt time
+            wait = self.login_throttle.check(username, source)
+            if wait:
+                print(f"Too many login attempts. Please try again in {math.ceil(wait)} seconds.")
+                return None
+
+            # Older databases can hold several accounts per username; the first one logs in
+            user_data = self.conn.execute(
+                "SELECT * FROM accounts WHERE username=? ORDER BY id LIMIT 1", (username,)
+            ).fetchone()
 
-            if user_data and bcrypt.checkpw(
-                    password.encode("utf-8"), user_data[2].encode("utf-8")
-            ):
+            # Unknown usernames are checked against a dummy hash so they take just as long
+            if self.credentials.check_password(password, user_data["password"] if user_data else None):
+                self.login_throttle.record_success(username)
+                self.start_session(user_data)
                 print("Login successful!")
                 return user_data
             else:
+                self.login_throttle.record_failure(username)
                 print("Invalid username or password. Please try again.")
-                continue
+        return None
+
+    # Function to issue a session token after a successful login. Processes started from
+    # here inherit it through the environment and can skip the password check.
+    def start_session(self, user_data):
+        self.session_token = self.sessions.issue(user_data["id"], "user")
+        os.environ[SESSION_ENV_VAR] = self.session_token
+
+    # Function to pick up an existing session; returns the account row or None
+    def resume_session(self, token):
+        claims = self.sessions.verify(token, role="user")
+        if claims is None:
+            return None
+        self.session_token = token
+        return self.conn.execute("SELECT * FROM accounts WHERE id=?", (claims["sub"],)).fetchone()
+
+    # Function to end the current session on logout
+    def end_session(self):
+        if self.session_token is not None:
+            self.sessions.revoke(self.session_token)
+            self.session_token = None
+        os.environ.pop(SESSION_ENV_VAR, None)
 
     # Function to create an admin user
-    def create_admin(self, cursor, conn):
-        cursor.execute(
-            "INSERT OR IGNORE INTO admins (username, password) VALUES (?, ?)",
-            (
-                "admin",
-                bcrypt.hashpw("admin@123".encode("utf-8"), bcrypt.gensalt()).decode(
-                    "utf-8"
-                ),
-            ),
-        )
-        conn.commit()
+    def create_admin(self):
+        self.credentials.ensure_admin(self.conn)
+
+
+# Function to work out an investment's (interest, total return); compound interest is
+# compounded annually
+def _investment_return(principal, annual_rate, years, interest_type):
+    r = annual_rate / 100
+    if interest_type == "simple":
+        interest = principal * r * years
+    else:
+        interest = principal * math.pow((1 + r), years) - principal
+    return interest, principal + interest
+
+
 class Calculator:
+    # Quotes go through a quote cache shared by every Calculator in the process, so the
+    # same question asked again (by this customer or another) is a dictionary lookup
+    def __init__(self, quote_cache=None):
+        self.quotes = quote_cache or get_quote_cache()
+
+    # Function to quote an investment; returns (interest earned, total return)
+    def investment_quote(self, principal, annual_rate, years, interest_type="compound"):
+        return self.quotes.quote("invest", _investment_return, principal, annual_rate, years, interest_type)
+
+    # Function to quote the level monthly repayment on a bond
+    def bond_quote(self, principal, annual_rate, months):
+        return self.quotes.quote("bond", amortization.monthly_repayment, principal, annual_rate, int(months))
+
+    # Function to get the full repayment schedule for a bond (shared; do not modify it)
+    def bond_schedule(self, principal, annual_rate, months, extra_monthly=0.0):
+        return self.quotes.quote(
+            "bond_schedule",
+            lambda p, r, m, extra: amortization.amortization_schedule(p, r, m, extra_monthly=extra),
+            principal, annual_rate, int(months), extra_monthly,
+        )
+
+    # Function to evaluate many investment scenarios without prompting. Each argument is a
+    # single value or a column of values (rates in percent, frequency = compounding periods
+    # per year); yields chunks of simple, compound and continuous interest columns.
+    # interest_scenarios is imported on first use; the interactive menus never need it.
+    def evaluate_scenarios(self, principals, rates, years, frequencies=12, chunk_size=None):
+        import interest_scenarios
+        return interest_scenarios.evaluate_chunks(
+            principals, rates, years, frequencies, chunk_size or interest_scenarios.DEFAULT_CHUNK_SIZE
+        )
+
+    # Function to evaluate every combination of the given values (a sensitivity grid)
+    def sensitivity_grid(self, principals, rates, years, frequencies=(12,), chunk_size=None):
+        import interest_scenarios
+        grid = interest_scenarios.scenario_grid(principals, rates, years, frequencies)
+        return interest_scenarios.evaluate_chunks(
+            *grid, chunk_size=chunk_size or interest_scenarios.DEFAULT_CHUNK_SIZE
+        )
+
+    # Function to stream evaluated scenarios to a CSV file, or to a directory of column
+    # files when columnar is True; returns the number of scenarios written
+    def export_scenarios(self, chunks, destination, columnar=False):
+        import interest_scenarios
+        if columnar:
+            return interest_scenarios.write_columns(chunks, destination)
+        return interest_scenarios.write_csv(chunks, destination)
+
     def financial_calculator(self):
         while True:
             print("\nFinancial Calculator")
@@ -564,23 +741,12 @@ class Calculator:
                 time = float(input("Enter time period (in years): "))
                 interest_type = input("Enter interest type (simple/compound): ")
 
-                r = rate_of_interest / 100
-                if interest_type.lower() == "simple":
-                    # Simple Interest Calculation
-                    simple_interest = principal * r * time
-                    total_amount = principal + simple_interest
-                    print(f"Simple Interest: R{simple_interest:.2f}")
-                    print(f"Total return: R{total_amount:.2f}")
-
-                elif interest_type.lower() == "compound":
-                    # Compound Interest Calculation
-                    compound_interest = principal * math.pow((1 + r), time) - principal
-                    total_amount = principal + compound_interest
-                    print(f"Compound Interest: R{compound_interest:.2f}")
-                    print(f"Total return: R{total_amount:.2f}")
-                else:
+                if interest_type.strip().lower() not in ("simple", "compound"):
                     print("Invalid interest type. Please enter 'simple' or 'compound'.")
                     return
+                interest, total_amount = self.investment_quote(principal, rate_of_interest, time, interest_type)
+                print(f"{interest_type.strip().capitalize()} Interest: R{interest:.2f}")
+                print(f"Total return: R{total_amount:.2f}")
 
             elif choice == "2":
                 # Bond Repayment Calculator
@@ -588,11 +754,26 @@ class Calculator:
                 annual_interest_rate = float(input("Enter annual interest rate (%): "))
                 number_of_months = int(input("Enter number of months to repay the bond: "))
 
-                i = annual_interest_rate / 100 / 12
-                n = number_of_months
-
-                monthly_repayment = (i * present_value) / (1 - math.pow((1 + i), -n))
+                monthly_repayment = self.bond_quote(present_value, annual_interest_rate, number_of_months)
                 print(f"Monthly Repayment: R{monthly_repayment:.2f}")
+
+                show_schedule = input("Show the full repayment schedule? (yes/no): ").lower()
+                if show_schedule == "yes":
+                    extra_payment = float(input("Extra amount paid every month (0 for none): R") or 0)
+                    schedule = self.bond_schedule(present_value, annual_interest_rate, number_of_months, extra_payment)
+                    print(f"{'Month':>5} {'Payment':>12} {'Interest':>12} {'Principal':>12} {'Balance':>14}")
+                    for row in schedule.rows():
+                        print(
+                            f"{row['month']:>5} {row['payment'] + row['extra']:>12.2f} {row['interest']:>12.2f} "
+                            f"{row['principal']:>12.2f} {row['balance']:>14.2f}"
+                        )
+                    print(f"Total Interest: R{schedule.total_interest:.2f}")
+                    print(f"Total Repaid: R{schedule.total_paid:.2f}")
+                    if extra_payment > 0:
+                        # Compare with the same bond without the extra payments
+                        standard = self.bond_schedule(present_value, annual_interest_rate, number_of_months)
+                        print(f"Paid off {len(standard) - len(schedule)} month(s) early, "
+                              f"saving R{standard.total_interest - schedule.total_interest:.2f} in interest")
             elif choice == "3":
                 while True:
                     another_calculation = input("Do you want to perform another calculation? (yes/no): ").lower()
@@ -609,6 +790,11 @@ class Calculator:
 if __name__ == "__main__":
     bank_db = BankDatabase()
 
+    # A session handed down by the main interface skips the login prompt
+    session_user = bank_db.resume_session(token_from_environment())
+    if session_user:
+        bank_db.handle_user_actions(session_user)
+
     while True:
         try:
             print(WELCOME_TEXT)
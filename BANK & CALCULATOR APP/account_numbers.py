@@ -0,0 +1,123 @@
+# account_numbers.py
+
+import hashlib
+import os
+
+# Account numbers are 10 digits: a 9-digit body followed by a Luhn check digit
+BODY_SPACE = 10 ** 9
+HALF_BITS = 15  # the Feistel network permutes 30-bit values (2**30 > BODY_SPACE)
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+SEQUENCE_NAME = "accounts"
+
+# The key decides the order numbers are handed out in. It must never change once
+# numbers have been issued from a database, or the mapping stops being one-to-one.
+DEFAULT_KEY = os.environ.get("BANKAPP_ACCOUNT_NUMBER_KEY", "5-stars-local-bank")
+
+
+# Function to compute the Luhn check digit for a string of digits
+def luhn_check_digit(digits):
+    total = 0
+    for index, char in enumerate(reversed(digits)):
+        digit = int(char)
+        if index % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return str((10 - total % 10) % 10)
+
+
+# Function to check that an account number carries a valid check digit
+def is_valid_account_number(account_number):
+    return (
+        len(account_number) == 10
+        and account_number.isdigit()
+        and luhn_check_digit(account_number[:-1]) == account_number[-1]
+    )
+
+
+class AccountNumberAllocator:
+    # Hands out account numbers from a counter stored in the database. Each counter value
+    # is scrambled by a keyed Feistel permutation: numbers look random, yet two counter
+    # values can never map to the same number, so allocation never retries.
+    def __init__(self, conn, key=DEFAULT_KEY):
+        self.conn = conn
+        # One 32-bit round key per Feistel round, derived from the configured key
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        self.round_keys = [int.from_bytes(digest[i * 4:i * 4 + 4], "big") for i in range(ROUNDS)]
+
+    # Cheap integer mixing is enough here: the goal is a scrambled order, not secrecy
+    def _round(self, value, round_number):
+        mixed = ((value ^ self.round_keys[round_number]) * 0x2C1B3C6D) & 0xFFFFFFFF
+        mixed ^= mixed >> 13
+        return mixed & HALF_MASK
+
+    def _feistel(self, value):
+        left, right = value >> HALF_BITS, value & HALF_MASK
+        for round_number in range(ROUNDS):
+            left, right = right, left ^ self._round(right, round_number)
+        return (left << HALF_BITS) | right
+
+    # Function to map a counter value to its 9-digit body. The permutation covers
+    # 2**30 values; walking the cycle until it lands below 10**9 keeps it a bijection.
+    def permute(self, counter):
+        value = self._feistel(counter)
+        while value >= BODY_SPACE:
+            value = self._feistel(value)
+        return value
+
+    # Function to turn a counter value into a full account number
+    def format_account_number(self, counter):
+        body = f"{self.permute(counter):09d}"
+        return body + luhn_check_digit(body)
+
+    # Function to claim `count` consecutive counter values in one update
+    def _reserve_counters(self, count):
+        started = not self.conn.in_transaction
+        cursor = self.conn.cursor()
+        try:
+            if started:
+                cursor.execute("BEGIN IMMEDIATE")
+            rows = cursor.execute(
+                "UPDATE account_number_sequence SET next_value = next_value + ? "
+                "WHERE name=? AND next_value + ? <= ? RETURNING next_value",
+                (count, SEQUENCE_NAME, count, BODY_SPACE),
+            ).fetchall()
+            if not rows:
+                raise RuntimeError("Account number space exhausted")
+            if started:
+                self.conn.commit()
+        except Exception:
+            if started:
+                self.conn.rollback()
+            raise
+        end = rows[0][0]
+        return range(end - count, end)
+
+    # Function to reserve a block of unique account numbers, e.g. for bulk onboarding
+    def reserve_block(self, count):
+        numbers = []
+        while len(numbers) < count:
+            needed = count - len(numbers)
+            candidates = [self.format_account_number(c) for c in self._reserve_counters(needed)]
+            # Numbers issued before this allocator existed were random and may clash, with
+            # an open account or a closed one that could still be restored; those few are
+            # skipped rather than reissued
+            existing = set()
+            for start in range(0, len(candidates), 400):
+                chunk = candidates[start:start + 400]
+                placeholders = ", ".join("?" for _ in chunk)
+                existing.update(
+                    row[0] for row in self.conn.execute(
+                        f"SELECT account_number FROM accounts WHERE account_number IN ({placeholders}) "
+                        f"UNION SELECT account_number FROM closed_accounts WHERE account_number IN ({placeholders})",
+                        chunk + chunk,
+                    )
+                )
+            numbers.extend(number for number in candidates if number not in existing)
+        return numbers
+
+    # Function to allocate a single account number
+    def allocate(self):
+        return self.reserve_block(1)[0]
@@ -0,0 +1,92 @@
+# account_registry.py
+
+import re
+from datetime import datetime
+
+from schema_migrations import migrate
+
+# Matches the lines BankDatabase.create_account used to append to bankdata.txt
+BANKDATA_LINE = re.compile(r"^Username: (?P<username>.*), Account Number: (?P<account_number>\d+)\s*$")
+
+
+class AccountRegistry:
+    # Structured replacement for bankdata.txt. Both lookups are index seeks on the
+    # account_registry table instead of a scan over a growing text file.
+    def __init__(self, conn):
+        self.conn = conn
+
+    # Function to record a newly created account (joins the caller's transaction, if any)
+    def register(self, username, account_number, registered_at=None):
+        if registered_at is None:
+            registered_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.conn.execute(
+            "INSERT OR IGNORE INTO account_registry (account_number, username, registered_at) VALUES (?, ?, ?)",
+            (account_number, username, registered_at),
+        )
+
+    # Function to find the username an account number belongs to
+    def find_by_account_number(self, account_number):
+        row = self.conn.execute(
+            "SELECT username FROM account_registry WHERE account_number=?", (account_number,)
+        ).fetchone()
+        return row[0] if row else None
+
+    # Function to list the account numbers registered to a username
+    def find_by_username(self, username):
+        rows = self.conn.execute(
+            "SELECT account_number FROM account_registry WHERE username=? ORDER BY registered_at",
+            (username,),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    # Function to load an existing bankdata.txt into the registry. Safe to run again:
+    # accounts that are already registered are skipped.
+    def import_bankdata(self, path="bankdata.txt"):
+        imported = 0
+        skipped = []
+        registered_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with open(path, encoding="utf-8") as bankdata_file, self.conn:
+            for line_number, line in enumerate(bankdata_file, start=1):
+                if not line.strip():
+                    continue
+                match = BANKDATA_LINE.match(line)
+                if not match:
+                    skipped.append((line_number, line.rstrip("\n")))
+                    continue
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO account_registry (account_number, username, registered_at) VALUES (?, ?, ?)",
+                    (match["account_number"], match["username"], registered_at),
+                )
+                imported += cursor.rowcount
+        return imported, skipped
+
+
+if __name__ == "__main__":
+    import argparse
+    from db_access import get_pool
+
+    parser = argparse.ArgumentParser(description="Look up or import the account registry")
+    parser.add_argument("--db", default="bankapp.db", help="database file (default: bankapp.db)")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--import-bankdata", metavar="PATH", help="import a bankdata.txt file")
+    group.add_argument("--username", help="list the account numbers of a username")
+    group.add_argument("--account-number", help="show the username of an account number")
+    args = parser.parse_args()
+
+    pool = get_pool(args.db)
+    conn = pool.connection()
+    migrate(conn)
+    registry = AccountRegistry(conn)
+
+    if args.import_bankdata:
+        imported, skipped = registry.import_bankdata(args.import_bankdata)
+        print(f"Imported {imported} account(s) from {args.import_bankdata}")
+        for line_number, line in skipped:
+            print(f"Skipped line {line_number}: {line}")
+    elif args.username:
+        for account_number in registry.find_by_username(args.username):
+            print(account_number)
+    else:
+        username = registry.find_by_account_number(args.account_number)
+        print(username if username is not None else "Account number not found")
+    pool.close()
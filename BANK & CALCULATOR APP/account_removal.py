@@ -0,0 +1,82 @@
+# account_removal.py
+
+from datetime import datetime
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class AccountRemover:
+    # Removes accounts in bulk as a soft delete. Each batch is one transaction: one
+    # DELETE ... RETURNING takes the accounts out of the live accounts table and reports
+    # exactly which ones went, and those rows are kept in closed_accounts so the removal
+    # can be undone. Ledger rows are not touched here; ledger_archive.LedgerArchiver moves
+    # them to the archive database in the background. Callers get back only what changed,
+    # so nothing has to re-read the accounts table.
+    def __init__(self, conn, batch_size=DEFAULT_BATCH_SIZE):
+        self.conn = conn
+        self.batch_size = batch_size
+
+    # Function to remove accounts by number.
+    # Returns (removed [(account_number, username, balance_cents)], account numbers not found).
+    def remove_accounts(self, account_numbers):
+        return self._in_batches(account_numbers, self._remove_batch)
+
+    # Function to bring removed accounts back.
+    # Returns (restored [(account_number, username, balance_cents)], account numbers not found).
+    def restore_accounts(self, account_numbers):
+        return self._in_batches(account_numbers, self._restore_batch)
+
+    def _in_batches(self, account_numbers, apply):
+        # Drop blanks and repeats but keep the caller's order
+        account_numbers = list(dict.fromkeys(
+            str(number).strip() for number in account_numbers if str(number).strip()
+        ))
+        changed = []
+        for start in range(0, len(account_numbers), self.batch_size):
+            changed.extend(apply(account_numbers[start:start + self.batch_size]))
+        changed_numbers = {row[0] for row in changed}
+        missing = [number for number in account_numbers if number not in changed_numbers]
+        return changed, missing
+
+    def _move(self, sql, insert_sql, params, extra=()):
+        conn = self.conn
+        # Inside a transaction the caller already has open, the batch joins it under a
+        # savepoint (so a failure undoes just this batch) and is left for the caller to commit
+        started = not conn.in_transaction
+        try:
+            conn.execute("BEGIN IMMEDIATE" if started else "SAVEPOINT move_accounts")
+            moved = conn.execute(sql, params).fetchall()
+            conn.executemany(insert_sql, [tuple(row) + tuple(extra) for row in moved])
+            if started:
+                conn.commit()
+            else:
+                conn.execute("RELEASE move_accounts")
+        except Exception:
+            if started:
+                conn.rollback()
+            else:
+                conn.execute("ROLLBACK TO move_accounts")
+                conn.execute("RELEASE move_accounts")
+            raise
+        # Rows come back as (id, account_number, username, password, balance_cents)
+        return [(row[1], row[2], row[4]) for row in moved]
+
+    def _remove_batch(self, account_numbers):
+        placeholders = ", ".join("?" for _ in account_numbers)
+        return self._move(
+            f"DELETE FROM accounts WHERE account_number IN ({placeholders}) "
+            "RETURNING id, account_number, username, password, balance_cents",
+            "INSERT INTO closed_accounts (id, account_number, username, password, balance_cents, closed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            account_numbers,
+            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),),
+        )
+
+    def _restore_batch(self, account_numbers):
+        placeholders = ", ".join("?" for _ in account_numbers)
+        return self._move(
+            f"DELETE FROM closed_accounts WHERE account_number IN ({placeholders}) "
+            "RETURNING id, account_number, username, password, balance_cents",
+            "INSERT INTO accounts (id, account_number, username, password, balance_cents) VALUES (?, ?, ?, ?, ?)",
+            account_numbers,
+        )
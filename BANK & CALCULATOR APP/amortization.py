@@ -0,0 +1,184 @@
+# amortization.py
+
+import operator
+from array import array
+from itertools import accumulate, repeat
+
+# A balance below half a cent counts as paid off
+PAYOFF_TOLERANCE = 0.005
+
+
+# NumPy is optional and only imported the first time a schedule is built. Without it the
+# schedule is folded with itertools.accumulate into array('d') columns.
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+# Function to work out the level monthly repayment for a loan (annual_rate in percent)
+def monthly_repayment(principal, annual_rate, months):
+    if months <= 0:
+        raise ValueError("Number of months must be positive")
+    i = annual_rate / 100 / 12
+    if i == 0:
+        return principal / months
+    return (i * principal) / (1 - (1 + i) ** -months)
+
+
+class AmortizationSchedule:
+    # The month-by-month breakdown of a loan as columns: month, payment (the scheduled
+    # instalment), extra, interest, principal and balance (after the month's payments).
+    # Columns are NumPy arrays, or array.array when NumPy is not installed.
+    COLUMNS = ("month", "payment", "extra", "interest", "principal", "balance")
+
+    def __init__(self, columns, backend):
+        self.columns = columns
+        self.backend = backend
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+
+    def __len__(self):
+        return len(self.month)
+
+    @property
+    def total_interest(self):
+        return float(sum(self.interest))
+
+    @property
+    def total_paid(self):
+        return float(sum(self.payment)) + float(sum(self.extra))
+
+    # Function to yield the schedule one month (dict) at a time, e.g. for printing
+    def rows(self):
+        for values in zip(*(self.columns[name] for name in self.COLUMNS)):
+            yield dict(zip(self.COLUMNS, (int(values[0]),) + tuple(float(value) for value in values[1:])))
+
+
+# Function to expand extra payments into one amount per month: a fixed extra every month
+# plus one-off lump sums ({month: amount}, months counted from 1)
+def _extra_per_month(months, extra_monthly, lump_sums):
+    extra = [float(extra_monthly)] * months
+    for month, amount in (lump_sums or {}).items():
+        if 1 <= month <= months:
+            extra[month - 1] += amount
+    return extra
+
+
+# Function to split the term into (first month, last month, annual rate) pieces
+def _rate_segments(months, annual_rate, rate_changes):
+    changes = {1: annual_rate}
+    for month, rate in (rate_changes or {}).items():
+        if 1 <= month <= months:
+            changes[month] = rate
+    starts = sorted(changes)
+    ends = [start - 1 for start in starts[1:]] + [months]
+    return [(start, end, changes[start]) for start, end in zip(starts, ends)]
+
+
+# Function to build a full amortization schedule (annual rates in percent).
+#   extra_monthly  paid on top of every instalment
+#   lump_sums      {month: amount} one-off extra payments
+#   rate_changes   {month: annual rate} new rate from that month on; the instalment is
+#                  recalculated over the remaining term, as a variable-rate bond would be
+# Extra payments shorten the loan: the schedule ends in the month the balance reaches 0.
+#
+# Within each stretch of constant rate i the balance after month k is
+#     B_k = G_k * (B_0 - sum_{j<=k} (payment + extra_j) / G_j),   G_k = (1 + i)^k
+# so a whole stretch is a power, a cumulative sum and a multiply, with no per-month loop.
+def amortization_schedule(principal, annual_rate, months, extra_monthly=0.0, lump_sums=None,
+                          rate_changes=None, use_numpy=True):
+    if principal < 0:
+        raise ValueError("Principal cannot be negative")
+    if months <= 0:
+        raise ValueError("Number of months must be positive")
+    extra = _extra_per_month(months, extra_monthly, lump_sums)
+    segments = _rate_segments(months, annual_rate, rate_changes)
+    np = _numpy() if use_numpy else None
+    if np is not None:
+        return _schedule_numpy(np, principal, months, extra, segments)
+    return _schedule_arrays(principal, months, extra, segments)
+
+
+def _schedule_numpy(np, principal, months, extra, segments):
+    extra = np.asarray(extra, dtype=float)
+    pieces = {name: [] for name in AmortizationSchedule.COLUMNS}
+    balance_start = float(principal)
+    for first, last, annual_rate in segments:
+        if balance_start <= PAYOFF_TOLERANCE:
+            break
+        i = annual_rate / 100 / 12
+        payment = monthly_repayment(balance_start, annual_rate, months - first + 1)
+        extras = extra[first - 1:last]
+        outflow = payment + extras
+        if i == 0:
+            balance = balance_start - np.cumsum(outflow)
+        else:
+            growth = np.power(1 + i, np.arange(1, last - first + 2, dtype=float))
+            balance = growth * (balance_start - np.cumsum(outflow / growth))
+
+        # Stop in the month the loan is paid off; that month pays exactly what is left
+        paid_off = np.flatnonzero(balance <= PAYOFF_TOLERANCE)
+        if paid_off.size:
+            end = int(paid_off[0]) + 1
+            balance, outflow = balance[:end].copy(), outflow[:end].copy()
+        opening = np.concatenate(([balance_start], balance[:-1]))
+        interest = opening * i
+        if paid_off.size:
+            outflow[-1] = opening[-1] + interest[-1]
+            balance[-1] = 0.0
+        scheduled = np.minimum(payment, outflow)
+
+        pieces["month"].append(np.arange(first, first + len(balance)))
+        pieces["payment"].append(scheduled)
+        pieces["extra"].append(outflow - scheduled)
+        pieces["interest"].append(interest)
+        pieces["principal"].append(outflow - interest)
+        pieces["balance"].append(balance)
+        balance_start = float(balance[-1])
+        if paid_off.size:
+            break
+
+    columns = {name: np.concatenate(parts) if parts else np.zeros(0) for name, parts in pieces.items()}
+    return AmortizationSchedule(columns, "numpy")
+
+
+def _schedule_arrays(principal, months, extra, segments):
+    columns = {name: array("d") for name in AmortizationSchedule.COLUMNS}
+    columns["month"] = array("i")
+    balance_start = float(principal)
+    for first, last, annual_rate in segments:
+        if balance_start <= PAYOFF_TOLERANCE:
+            break
+        i = annual_rate / 100 / 12
+        payment = monthly_repayment(balance_start, annual_rate, months - first + 1)
+        outflow = list(map(operator.add, repeat(payment), extra[first - 1:last]))
+        # Without NumPy the recurrence B_k = B_{k-1} * (1 + i) - outflow_k is folded with
+        # accumulate; that is one pass and cheaper in pure Python than the closed form
+        growth = 1 + i
+        balance = list(accumulate(outflow, lambda value, paid: value * growth - paid, initial=balance_start))[1:]
+
+        # Stop in the month the loan is paid off; that month pays exactly what is left
+        end = next((index + 1 for index, value in enumerate(balance) if value <= PAYOFF_TOLERANCE), None)
+        if end is not None:
+            balance, outflow = balance[:end], outflow[:end]
+        opening = [balance_start] + balance[:-1]
+        interest = list(map(operator.mul, opening, repeat(i)))
+        if end is not None:
+            outflow[-1] = opening[-1] + interest[-1]
+            balance[-1] = 0.0
+        scheduled = list(map(min, repeat(payment), outflow))
+
+        columns["month"].extend(range(first, first + len(balance)))
+        columns["payment"].extend(scheduled)
+        columns["extra"].extend(map(operator.sub, outflow, scheduled))
+        columns["interest"].extend(interest)
+        columns["principal"].extend(map(operator.sub, outflow, interest))
+        columns["balance"].extend(balance)
+        balance_start = balance[-1]
+        if end is not None:
+            break
+
+    return AmortizationSchedule(columns, "array")
@@ -0,0 +1,120 @@
+# audit_log.py
+
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+class AuditLogWriter:
+    # Keeps the transaction log file open and writes entries from a background thread.
+    # Callers only put a line on a bounded queue; the writer drains it in batches, writing
+    # each batch at most flush_interval seconds after its first entry was queued, and
+    # rotates the file by size or when the date changes.
+    # With fsync=True every batch is forced to disk before the writer moves on.
+    def __init__(self, path="transaction_log.txt", max_queue=10000, batch_size=500,
+                 flush_interval=1.0, max_bytes=10 * 1024 * 1024, backup_count=5,
+                 rotate_daily=False, fsync=False):
+        self.path = os.path.abspath(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_daily = rotate_daily
+        self.fsync = fsync
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.file = None
+        self.opened_on = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self.thread.start()
+        # Entries still queued when the interpreter exits are written, not dropped
+        atexit.register(self.close)
+
+    # Function to queue one transaction entry (blocks only if the queue is full)
+    def log(self, username, transaction_type, amount, balance, transaction_time=None):
+        if self.closed:
+            raise RuntimeError("Audit log is closed")
+        if transaction_time is None:
+            transaction_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.queue.put(
+            f"Username: {username}, Transaction Type: {transaction_type}, Amount: {amount}, Balance: {balance}, Time: {transaction_time}\n"
+        )
+
+    # Function to wait until every queued entry has been written
+    def flush(self):
+        self.queue.join()
+
+    # Function to write the remaining entries and stop the writer thread
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.opened_on = datetime.now().date()
+
+    def _rotate(self):
+        self.file.close()
+        if self.rotate_daily and self.opened_on != datetime.now().date():
+            target = f"{self.path}.{self.opened_on.isoformat()}"
+        else:
+            # Shift path.1 -> path.2 ... and drop the oldest backup
+            for index in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{index}"):
+                    os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+            target = f"{self.path}.1"
+        os.replace(self.path, target)
+        self._open()
+
+    def _needs_rotation(self, pending_bytes):
+        if self.rotate_daily and self.opened_on != datetime.now().date():
+            return True
+        size = self.file.tell()
+        return self.max_bytes and size > 0 and size + pending_bytes > self.max_bytes
+
+    def _write(self, lines):
+        data = "".join(lines)
+        if self._needs_rotation(len(data)):
+            self._rotate()
+        self.file.write(data)
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def _run(self):
+        self._open()
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+
+            # Collect entries until the batch is full or the flush interval has passed
+            lines = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stopping = True
+                    break
+                lines.append(item)
+                remaining = deadline - time.monotonic()
+                if len(lines) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            try:
+                if lines:
+                    self._write(lines)
+            except OSError as e:
+                print("Error writing transaction log:", e)
+            finally:
+                for _ in range(len(lines) + (1 if stopping else 0)):
+                    self.queue.task_done()
+        self.file.close()
@@ -0,0 +1,227 @@
+# balance_engine.py
+
+import threading
+from datetime import datetime
+
+from db_access import get_pool
+from ledger_archive import ARCHIVE_SCHEMA, attach_archive
+from money import format_cents
+from posting_engine import CREDIT_TYPES
+
+# Balances and the ledger are integer cents, so any difference at all is drift
+DEFAULT_TOLERANCE = 0
+DEFAULT_BATCH_SIZE = 500
+
+_CREDITS = ", ".join(f"'{transaction_type}'" for transaction_type in CREDIT_TYPES)
+
+
+# Function to build the query for the signed ledger total and last row id after a
+# checkpoint, over the given ledger tables. Rows being moved to the archive can briefly
+# be in both databases; UNION (not UNION ALL) counts them once.
+def _delta_sql(tables):
+    rows = " UNION ".join(
+        f"SELECT id, transaction_type, amount_cents FROM {table} WHERE account_id = :account_id AND id > :checkpoint_id"
+        for table in tables
+    )
+    return (
+        f"SELECT COALESCE(SUM(CASE WHEN transaction_type IN ({_CREDITS}) THEN amount_cents ELSE -amount_cents END), 0), "
+        f"MAX(id) FROM ({rows})"
+    )
+
+
+# Rows of removed accounts parked in archived_transactions still count towards the ledger
+DELTA_SQL = _delta_sql(("main.transactions", "main.archived_transactions"))
+# Used once the archive database exists and is attached
+ARCHIVE_DELTA_SQL = _delta_sql(("main.transactions", "main.archived_transactions", f"{ARCHIVE_SCHEMA}.transactions"))
+
+
+class BalanceEngine:
+    # Checks accounts.balance_cents against the ledger without summing the whole ledger. Each
+    # account has a checkpoint: its ledger balance as of a transaction id. Verifying an
+    # account reads the checkpoint and sums only the rows after it (an index range scan),
+    # then moves the checkpoint forward, so the cost depends on how many postings happened
+    # since the last check rather than on the size of the history.
+    #
+    # Checkpoints are always ledger-derived, never copied from accounts.balance_cents, so a
+    # drifted balance column cannot leak into them.
+    def __init__(self, conn, tolerance=DEFAULT_TOLERANCE):
+        self.conn = conn
+        self.tolerance = tolerance
+
+    # Function to verify one account; returns a result dict (see verify_many) or None if
+    # there is no such account
+    def verify(self, account_id):
+        results = self.verify_many([account_id])
+        return results[0] if results else None
+
+    # Function to verify several accounts against one consistent snapshot. Returns a list
+    # of {"account_id", "stored_balance_cents", "ledger_balance_cents", "drift_cents",
+    # "transaction_id"}; accounts that drifted are also recorded in the balance_drift table.
+    def verify_many(self, account_ids):
+        conn = self.conn
+        results = []
+        checkpoints = []
+        # Rows of old accounts may already live in the archive database, if there is one
+        delta_sql = ARCHIVE_DELTA_SQL if attach_archive(conn, create=False) else DELTA_SQL
+        # One read transaction, so every balance is compared with the ledger as of the
+        # same moment (a posting updates both together)
+        started = not conn.in_transaction
+        if started:
+            conn.execute("BEGIN")
+        try:
+            for account_id in account_ids:
+                account = conn.execute("SELECT balance_cents FROM accounts WHERE id=?", (account_id,)).fetchone()
+                if account is None:
+                    continue
+                checkpoint = conn.execute(
+                    "SELECT transaction_id, balance_cents FROM balance_checkpoints WHERE account_id=?", (account_id,)
+                ).fetchone()
+                checkpoint_id, checkpoint_balance = tuple(checkpoint) if checkpoint else (0, 0)
+                delta, last_id = conn.execute(
+                    delta_sql, {"account_id": account_id, "checkpoint_id": checkpoint_id}
+                ).fetchone()
+                ledger_balance = checkpoint_balance + delta
+                transaction_id = last_id if last_id is not None else checkpoint_id
+                results.append({
+                    "account_id": account_id,
+                    "stored_balance_cents": account[0],
+                    "ledger_balance_cents": ledger_balance,
+                    "drift_cents": account[0] - ledger_balance,
+                    "transaction_id": transaction_id,
+                })
+                # Only move the checkpoint when there were new rows (or there was none yet)
+                if last_id is not None or checkpoint is None:
+                    checkpoints.append((account_id, transaction_id, ledger_balance))
+        finally:
+            if started:
+                conn.commit()
+        self._record(checkpoints, [result for result in results if abs(result["drift_cents"]) > self.tolerance])
+        return results
+
+    def _record(self, checkpoints, drifted):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn = self.conn
+        # Inside a transaction the caller already has open, the caller commits these
+        started = not conn.in_transaction
+        try:
+            conn.executemany(
+                "INSERT INTO balance_checkpoints (account_id, transaction_id, balance_cents, checkpointed_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (account_id) DO UPDATE SET "
+                "transaction_id=excluded.transaction_id, balance_cents=excluded.balance_cents, "
+                "checkpointed_at=excluded.checkpointed_at WHERE excluded.transaction_id >= transaction_id",
+                [checkpoint + (now,) for checkpoint in checkpoints],
+            )
+            # A drift is recorded once, not again on every pass that still sees it
+            conn.executemany(
+                "INSERT INTO balance_drift "
+                "(account_id, stored_balance_cents, ledger_balance_cents, transaction_id, detected_at) "
+                "SELECT ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM balance_drift "
+                "WHERE account_id=? AND stored_balance_cents=? AND ledger_balance_cents=?)",
+                [
+                    (result["account_id"], result["stored_balance_cents"], result["ledger_balance_cents"],
+                     result["transaction_id"], now,
+                     result["account_id"], result["stored_balance_cents"], result["ledger_balance_cents"])
+                    for result in drifted
+                ],
+            )
+            if started:
+                conn.commit()
+        except Exception:
+            if started:
+                conn.rollback()
+            raise
+
+
+class BalanceReconciler:
+    # Walks every account in id order in the background, verifying a batch at a time with
+    # BalanceEngine, and reports accounts whose stored balance has drifted from the
+    # ledger. Because checkpoints move forward on every pass, a pass over accounts that
+    # have been quiet since the last one costs one index probe per account.
+    def __init__(self, db_file="bankapp.db", interval=3600.0, batch_size=DEFAULT_BATCH_SIZE,
+                 tolerance=DEFAULT_TOLERANCE, on_drift=None):
+        self.db_file = db_file
+        self.interval = interval
+        self.batch_size = batch_size
+        self.tolerance = tolerance
+        self.on_drift = on_drift or self.report_drift
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    # Function to print a drifted account (the default on_drift)
+    def report_drift(self, result):
+        print(
+            f"Balance drift on account {result['account_id']}: stored R{format_cents(result['stored_balance_cents'])}, "
+            f"ledger R{format_cents(result['ledger_balance_cents'])} (as of transaction {result['transaction_id']})"
+        )
+
+    # Function to verify every account once; returns (accounts checked, accounts drifted)
+    def run_once(self):
+        engine = BalanceEngine(get_pool(self.db_file).connection(), self.tolerance)
+        checked = drifted = 0
+        last_id = 0
+        while not self.stop_event.is_set():
+            account_ids = [row[0] for row in engine.conn.execute(
+                "SELECT id FROM accounts WHERE id > ? ORDER BY id LIMIT ?", (last_id, self.batch_size)
+            )]
+            if not account_ids:
+                break
+            for result in engine.verify_many(account_ids):
+                checked += 1
+                if abs(result["drift_cents"]) > self.tolerance:
+                    drifted += 1
+                    self.on_drift(result)
+            last_id = account_ids[-1]
+        return checked, drifted
+
+    # Function to start reconciling in the background every `interval` seconds
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="balance-reconciler", daemon=True)
+            self.thread.start()
+
+    # Function to ask the background thread to reconcile now
+    def wake(self):
+        self.wake_event.set()
+
+    def _run(self):
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    checked, drifted = self.run_once()
+                    if drifted:
+                        print(f"Balance reconciliation: {drifted} of {checked} account(s) drifted")
+                except Exception as e:
+                    print(f"Balance reconciliation failed: {e}")
+                self.wake_event.wait(self.interval)
+                self.wake_event.clear()
+        finally:
+            get_pool(self.db_file).release()
+
+    # Function to stop the background thread after its current batch
+    def close(self):
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+if __name__ == "__main__":
+    import argparse
+    from schema_migrations import migrate
+
+    parser = argparse.ArgumentParser(description="Check account balances against the ledger")
+    parser.add_argument("--db", default="bankapp.db", help="database file (default: bankapp.db)")
+    parser.add_argument("--account-id", type=int, help="check only this account")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="accounts per snapshot")
+    args = parser.parse_args()
+
+    migrate(get_pool(args.db).connection())
+    if args.account_id is not None:
+        result = BalanceEngine(get_pool(args.db).connection()).verify(args.account_id)
+        print(result if result else f"No account with id {args.account_id}")
+    else:
+        reconciler = BalanceReconciler(args.db, batch_size=args.batch_size)
+        checked, drifted = reconciler.run_once()
+        print(f"Checked {checked} account(s); {drifted} drifted.")
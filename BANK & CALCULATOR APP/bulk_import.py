@@ -0,0 +1,169 @@
+# bulk_import.py
+
+import argparse
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+from account_numbers import AccountNumberAllocator
+from credentials import CredentialService
+from db_access import get_pool
+from money import parse_rands
+from schema_migrations import migrate
+
+REQUIRED_COLUMNS = ("username", "password", "initial_deposit")
+CREDENTIALS = CredentialService()
+
+
+# Function to hash one password (module level so process pools can pickle it)
+def hash_password(password):
+    return CREDENTIALS.hash_password(password)
+
+
+# Function to check one CSV row; returns (username, password, deposit in cents) or an error message
+def validate_row(row):
+    username = (row.get("username") or "").strip()
+    password = row.get("password") or ""
+    if not username:
+        return "Username is missing"
+    if " " in username:
+        return "Username cannot contain spaces"
+    if not password:
+        return "Password is missing"
+    try:
+        initial_deposit = parse_rands(row.get("initial_deposit") or "")
+    except ValueError:
+        return "Initial deposit is not an amount in rands"
+    if initial_deposit < 0:
+        return "Initial deposit cannot be negative"
+    return username, password, initial_deposit
+
+
+class BulkImporter:
+    # Streams new customers from a CSV file into the database. Passwords are hashed in
+    # parallel (bcrypt releases the GIL, so threads scale; processes are optional), and
+    # each batch of accounts, registry entries and initial deposits is one transaction.
+    def __init__(self, db_file="bankapp.db", batch_size=1000, workers=None, use_processes=False):
+        self.pool = get_pool(db_file)
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.use_processes = use_processes
+        migrate(self.pool.connection())
+
+    # Function to import a CSV file; returns (accounts created, [(line number, error)])
+    def import_csv(self, path):
+        created = 0
+        errors = []
+        executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        with open(path, newline="", encoding="utf-8") as csv_file, executor_class(self.workers) as executor:
+            reader = csv.DictReader(csv_file)
+            missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"CSV file is missing column(s): {', '.join(missing)}")
+
+            seen_usernames = set()
+            # Data starts on line 2, after the header
+            numbered_rows = enumerate(reader, start=2)
+            while True:
+                batch = list(islice(numbered_rows, self.batch_size))
+                if not batch:
+                    break
+                batch_created, batch_errors = self._import_batch(batch, seen_usernames, executor)
+                created += batch_created
+                errors.extend(batch_errors)
+        return created, errors
+
+    def _import_batch(self, batch, seen_usernames, executor):
+        conn = self.pool.connection()
+        errors = []
+        valid = []
+        for line_number, row in batch:
+            result = validate_row(row)
+            if isinstance(result, str):
+                errors.append((line_number, result))
+            elif result[0] in seen_usernames:
+                errors.append((line_number, "Username appears more than once in the file"))
+            else:
+                seen_usernames.add(result[0])
+                valid.append((line_number,) + result)
+
+        # Usernames that already exist are rejected with one indexed lookup per batch
+        if valid:
+            usernames = [username for _, username, _, _ in valid]
+            taken = {
+                row[0] for row in conn.execute(
+                    f"SELECT username FROM accounts WHERE username IN ({', '.join('?' for _ in usernames)})",
+                    usernames,
+                )
+            }
+            for line_number, username, _, _ in valid:
+                if username in taken:
+                    errors.append((line_number, "Username already in use"))
+            valid = [entry for entry in valid if entry[1] not in taken]
+        if not valid:
+            return 0, errors
+
+        hashed_passwords = list(executor.map(
+            hash_password, [password for _, _, password, _ in valid],
+            chunksize=max(1, len(valid) // (self.workers * 4)),
+        ))
+
+        transaction_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            account_numbers = AccountNumberAllocator(conn).reserve_block(len(valid))
+            conn.executemany(
+                "INSERT INTO accounts (account_number, username, password, balance_cents) VALUES (?, ?, ?, ?)",
+                [
+                    (account_number, username, hashed_password, deposit)
+                    for (_, username, _, deposit), account_number, hashed_password
+                    in zip(valid, account_numbers, hashed_passwords)
+                ],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO account_registry (account_number, username, registered_at) VALUES (?, ?, ?)",
+                [
+                    (account_number, username, transaction_time)
+                    for (_, username, _, _), account_number in zip(valid, account_numbers)
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO transactions (account_id, transaction_type, amount_cents, transaction_time) "
+                "SELECT id, 'Initial Deposit', ?, ? FROM accounts WHERE account_number=?",
+                [
+                    (deposit, transaction_time, account_number)
+                    for (_, _, _, deposit), account_number in zip(valid, account_numbers)
+                ],
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            errors.extend((line_number, f"Batch failed: {e}") for line_number, _, _, _ in valid)
+            return 0, errors
+        return len(valid), errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create accounts in bulk from a CSV file")
+    parser.add_argument("csv_file", help="CSV with username, password and initial_deposit columns")
+    parser.add_argument("--db", default="bankapp.db", help="database file (default: bankapp.db)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="accounts per transaction")
+    parser.add_argument("--workers", type=int, default=None, help="password hashing workers")
+    parser.add_argument("--processes", action="store_true", help="hash in processes instead of threads")
+    parser.add_argument("--errors", metavar="PATH", help="write rejected rows to this CSV file")
+    args = parser.parse_args()
+
+    importer = BulkImporter(args.db, args.batch_size, args.workers, args.processes)
+    created, errors = importer.import_csv(args.csv_file)
+    print(f"Created {created} account(s); {len(errors)} row(s) rejected.")
+
+    if args.errors:
+        with open(args.errors, "w", newline="", encoding="utf-8") as errors_file:
+            writer = csv.writer(errors_file)
+            writer.writerow(["line", "error"])
+            writer.writerows(sorted(errors))
+    else:
+        for line_number, message in sorted(errors):
+            print(f"Line {line_number}: {message}")
@@ -1,91 +1,53 @@
 import random
-import sqlite3
 import string
 from tkinter import Tk, Label, Frame, Entry, Button, messagebox
-import bcrypt
-import os
+from datetime import datetime
+from account_numbers import AccountNumberAllocator
+from account_registry import AccountRegistry
+from credentials import CredentialService
+from db_access import get_pool
+from gui_tasks import TaskRunner
+from money import parse_rands
+from schema_migrations import migrate
 
 class BankDatabase:
     def __init__(self, db_file="bankapp.db"):
-        db_file = os.path.abspath(db_file)
-        self.conn = sqlite3.connect(db_file)
+        self.pool = get_pool(db_file)
+        self.credentials = CredentialService()
         self.create_tables()
         print("BankDatabase instance initialized")
 
-    def create_tables(self):
-        with self.conn:
-            cursor = self.conn.cursor()
+    # Each thread works on its own pooled connection
+    @property
+    def conn(self):
+        return self.pool.connection()
 
-            # Create the accounts table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS accounts (
-                    account_number TEXT PRIMARY KEY,
-                    username TEXT,
-                    salt TEXT,
-                    hashed_password TEXT,
-                    balance REAL
-                )
-            ''')
-
-            # Create the transactions table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS transactions (
-                    transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    account_number TEXT,
-                    amount REAL,
-                    description TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (account_number) REFERENCES accounts(account_number)
-                )
-            ''')
-
-            # Add the missing column 'account_number' to the transactions table
-            cursor.execute('PRAGMA foreign_keys=off;')
-            cursor.execute('BEGIN TRANSACTION;')
-            cursor.execute('ALTER TABLE transactions RENAME TO _transactions_backup;')
+    def create_tables(self):
+        # Create or upgrade the tables to the current schema version
+        migrate(self.conn)
 
-            cursor.execute('''
-                CREATE TABLE transactions (
-                    transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    account_number TEXT,
-                    amount REAL,
-                    description TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (account_number) REFERENCES accounts(account_number)
-                )
-            ''')
-
-            cursor.execute('INSERT INTO transactions SELECT * FROM _transactions_backup;')
-            cursor.execute('DROP TABLE _transactions_backup;')
-            cursor.execute('COMMIT;')
-            cursor.execute('PRAGMA foreign_keys=on;')
-
-        print("Tables created")
-
-    def store_initial_deposit(self, account_number, initial_deposit):
+    def store_initial_deposit(self, account_id, initial_deposit):
         with self.conn:
             cursor = self.conn.cursor()
 
             # Insert the initial deposit as a transaction
             cursor.execute('''
-                INSERT INTO transactions (account_number, amount, description)
-                VALUES (?, ?, ?)
-            ''', (account_number, initial_deposit, 'Initial Deposit'))
+                INSERT INTO transactions (account_id, transaction_type, amount_cents, transaction_time)
+                VALUES (?, ?, ?, ?)
+            ''', (account_id, 'Initial Deposit', initial_deposit, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
 
     def generate_account_number(self):
-        return ''.join(random.choices(string.digits, k=10))
+        return AccountNumberAllocator(self.conn).allocate()
 
     def generate_random_password(self, length=12):
         characters = string.ascii_letters + string.digits + string.punctuation
         return ''.join(random.choice(characters) for _ in range(length))
 
     def hash_password(self, password):
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return salt.decode('utf-8'), hashed_password.decode('utf-8')
+        return self.credentials.hash_password(password)
 
     def is_valid_password(self, password, hashed_password):
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+        return self.credentials.check_password(password, hashed_password)
 
     def create_account(self, username, password, confirm_password, initial_deposit):
         if not all((username, password, confirm_password, initial_deposit)):
@@ -94,18 +56,32 @@ class BankDatabase:
         if password != confirm_password:
             raise ValueError("Passwords do not match")
 
-        salt, hashed_password = self.hash_password(password)
+        # Typed in rands, stored as integer cents
+        try:
+            initial_deposit = parse_rands(initial_deposit)
+        except ValueError:
+            raise ValueError("Initial deposit must be an amount in rands, e.g. 150 or 150.50")
+        if initial_deposit < 0:
+            raise ValueError("Initial deposit cannot be negative")
+
+        if self.conn.execute("SELECT 1 FROM accounts WHERE username=?", (username,)).fetchone():
+            raise ValueError("Username already in use")
+
+        # Hash only once every check has passed; the bcrypt hash embeds its own salt
+        hashed_password = self.hash_password(password)
 
         account_number = self.generate_account_number()
 
         with self.conn:
             cursor = self.conn.cursor()
-            cursor.execute("INSERT INTO accounts (account_number, username, salt, hashed_password, balance) VALUES (?, ?, ?, ?, ?)",
-                           (account_number, username, salt, hashed_password, float(initial_deposit)))
+            cursor.execute("INSERT INTO accounts (account_number, username, password, balance_cents) VALUES (?, ?, ?, ?)",
+                           (account_number, username, hashed_password, initial_deposit))
+            account_id = cursor.lastrowid
+            AccountRegistry(self.conn).register(username, account_number)
             print("Account created")
 
         # Store the initial deposit as a transaction
-        self.store_initial_deposit(account_number, float(initial_deposit))
+        self.store_initial_deposit(account_id, initial_deposit)
 
         # Commit the changes to the database
         self.conn.commit()
@@ -113,8 +89,13 @@ class BankDatabase:
 class BankApp:
     def __init__(self, master):
         self.master = master
-        self.master.title("Bank App")
+        # master is the window when run on its own, or a frame inside the main interface
+        self.master.winfo_toplevel().title("Bank App")
         self.bank_db = BankDatabase()
+        # Hashing and inserts run off the Tk thread so the window stays responsive
+        self.task_runner = TaskRunner(self.master)
+        self.create_task = None
+        self.master.bind("<Destroy>", self.on_destroy, add="+")
         self.setup_ui()
 
     def setup_ui(self):
@@ -153,8 +134,8 @@ class BankApp:
         self.initial_deposit_entry.bind("<FocusOut>", lambda event: self.on_entry_focus_out(event, "Initial Deposit"))
         self.initial_deposit_entry.pack(pady=12, padx=10)
 
-        button = Button(master=frame, text='Create', command=self.on_confirm_button_click, bg="#2ECC71", fg="white")
-        button.pack(pady=12, padx=10)
+        self.create_button = Button(master=frame, text='Create', command=self.on_confirm_button_click, bg="#2ECC71", fg="white")
+        self.create_button.pack(pady=12, padx=10)
 
     def on_entry_focus_in(self, event, placeholder):
         if event.widget.get() == placeholder:
@@ -170,11 +151,25 @@ class BankApp:
         confirm_password = self.confirm_pass.get()
         initial_deposit = self.initial_deposit_entry.get()
 
-        try:
-            self.bank_db.create_account(username, password, confirm_password, initial_deposit)
-            messagebox.showinfo("Account Created", "Account has been successfully created!")
-        except ValueError as e:
-            messagebox.showerror("Error", str(e))
+        # The Create button stays disabled until this request finishes
+        self.create_task = self.task_runner.submit(
+            self.bank_db.create_account, username, password, confirm_password, initial_deposit,
+            on_success=self.on_account_created, on_error=self.on_create_failed,
+            busy_widgets=(self.create_button,),
+        )
+
+    def on_account_created(self, _):
+        messagebox.showinfo("Account Created", "Account has been successfully created!")
+
+    def on_create_failed(self, error):
+        if isinstance(error, ValueError):
+            messagebox.showerror("Error", str(error))
+        else:
+            messagebox.showerror("Error", f"Failed to create the account: {error}")
+
+    def on_destroy(self, event):
+        if event.widget is self.master:
+            self.task_runner.shutdown()
 
 if __name__ == "__main__":
     root = Tk()
@@ -0,0 +1,65 @@
+# credentials.py
+
+import os
+import secrets
+import threading
+
+# bcrypt cost factor; production keeps the default, test fixtures can set e.g. 4
+DEFAULT_ROUNDS = int(os.environ.get("BANKAPP_BCRYPT_ROUNDS", "12"))
+
+DEFAULT_ADMIN_USERNAME = "admin"
+DEFAULT_ADMIN_PASSWORD = "admin@123"
+
+
+# bcrypt is only imported the first time a password is hashed or checked, so entry points
+# that never reach a password prompt don't pay for loading it
+def _bcrypt():
+    import bcrypt
+    return bcrypt
+
+
+class CredentialService:
+    # The one place passwords are hashed and checked, so each password costs exactly one
+    # bcrypt round at the configured cost factor.
+    def __init__(self, rounds=DEFAULT_ROUNDS):
+        self.rounds = rounds
+        self._dummy_hash = None
+        self._dummy_lock = threading.Lock()
+
+    # A throwaway hash at the same cost factor, made once and then reused. Checking
+    # against it makes "no such user" take as long as "wrong password".
+    def dummy_hash(self):
+        with self._dummy_lock:
+            if self._dummy_hash is None:
+                self._dummy_hash = self.hash_password(secrets.token_urlsafe(16))
+            return self._dummy_hash
+
+    # Function to hash a password; the returned hash embeds its own salt
+    def hash_password(self, password):
+        bcrypt = _bcrypt()
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(self.rounds)).decode("utf-8")
+
+    # Function to check a password against a stored hash (False if there is no hash)
+    def check_password(self, password, hashed_password):
+        bcrypt = _bcrypt()
+        if not hashed_password:
+            bcrypt.checkpw(password.encode("utf-8"), self.dummy_hash().encode("utf-8"))
+            return False
+        return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+    # Function to check an admin's username and password. Unknown usernames are checked
+    # against the dummy hash, so they take as long as a wrong password.
+    def verify_admin(self, conn, username, password):
+        admin_data = conn.execute("SELECT password FROM admins WHERE username=?", (username,)).fetchone()
+        return self.check_password(password, admin_data[0] if admin_data else None)
+
+    # Function to create the default admin, hashing its password only if it is missing
+    def ensure_admin(self, conn, username=DEFAULT_ADMIN_USERNAME, password=DEFAULT_ADMIN_PASSWORD):
+        if conn.execute("SELECT 1 FROM admins WHERE username=?", (username,)).fetchone():
+            return False
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO admins (username, password) VALUES (?, ?)",
+                (username, self.hash_password(password)),
+            )
+        return True
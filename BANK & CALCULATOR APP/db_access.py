@@ -0,0 +1,136 @@
+# db_access.py
+
+import os
+import sqlite3
+import threading
+import weakref
+
+# Tuned for many short reads and small write transactions from several sessions at once
+DEFAULT_OPTIONS = {
+    "max_connections": 8,
+    "busy_timeout_ms": 5000,
+    "synchronous": "NORMAL",  # safe with WAL: a crash can only lose the last commits, never corrupt
+    "cache_size_kib": 16384,
+    "cached_statements": 256,  # prepared statements kept per connection
+    "acquire_timeout": 30.0,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class _Lease:
+    # Holds one thread's connection. When the thread ends its thread-local storage is
+    # cleared, the lease is garbage collected and the connection goes back to the pool.
+    def __init__(self, pool, conn):
+        self.conn = conn
+        self.finalizer = weakref.finalize(self, pool._return, conn)
+
+
+class ConnectionPool:
+    # A bounded set of SQLite connections to one database file. Each thread gets its own
+    # connection the first time it asks and keeps it until it releases it or exits, so
+    # repeated queries from the same thread never pay the connect cost again.
+    def __init__(self, db_file, **options):
+        self.db_file = db_file
+        self.options = dict(DEFAULT_OPTIONS, **options)
+        self.idle = []
+        self.open_count = 0
+        self.closed = False
+        self.local = threading.local()
+        self.condition = threading.Condition()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=self.options["busy_timeout_ms"] / 1000,
+            cached_statements=self.options["cached_statements"],
+            # Connections are handed from thread to thread, but only one thread uses each at a time
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.options['synchronous']}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.options['busy_timeout_ms'])}")
+        conn.execute(f"PRAGMA cache_size={-int(self.options['cache_size_kib'])}")
+        return conn
+
+    # Function to get the calling thread's connection, waiting for a free slot if needed
+    def connection(self):
+        lease = getattr(self.local, "lease", None)
+        if lease is not None:
+            return lease.conn
+
+        with self.condition:
+            if self.closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            if not self.idle and self.open_count >= self.options["max_connections"]:
+                if not self.condition.wait_for(
+                    lambda: self.idle or self.open_count < self.options["max_connections"] or self.closed,
+                    timeout=self.options["acquire_timeout"],
+                ):
+                    raise sqlite3.OperationalError(f"No free database connection for {self.db_file}")
+                if self.closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+            if self.idle:
+                conn = self.idle.pop()
+            else:
+                self.open_count += 1
+                conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except sqlite3.Error:
+                with self.condition:
+                    self.open_count -= 1
+                    self.condition.notify()
+                raise
+        self.local.lease = _Lease(self, conn)
+        return conn
+
+    # Function to hand the calling thread's connection back to the pool
+    def release(self):
+        lease = getattr(self.local, "lease", None)
+        if lease is not None:
+            del self.local.lease
+            lease.finalizer()
+
+    def _return(self, conn):
+        # Never hand out a connection with a half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+        with self.condition:
+            if self.closed:
+                conn.close()
+                self.open_count -= 1
+            else:
+                self.idle.append(conn)
+            self.condition.notify()
+
+    # Function to close every idle connection and refuse new ones; connections still held
+    # by other threads are closed as they are returned
+    def close(self):
+        self.release()
+        with self.condition:
+            self.closed = True
+            for conn in self.idle:
+                conn.close()
+                self.open_count -= 1
+            self.idle = []
+            self.condition.notify_all()
+        with _pools_lock:
+            if _pools.get(self.db_file) is self:
+                del _pools[self.db_file]
+
+
+# Function to get the shared pool for a database file, creating it on first use.
+# Options only take effect when the pool is created.
+def get_pool(db_file, **options):
+    if db_file != ":memory:":
+        db_file = os.path.abspath(db_file)
+    with _pools_lock:
+        pool = _pools.get(db_file)
+        if pool is None:
+            pool = _pools[db_file] = ConnectionPool(db_file, **options)
+        return pool
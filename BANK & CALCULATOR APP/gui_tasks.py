@@ -0,0 +1,97 @@
+# gui_tasks.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskHandle:
+    # Returned by TaskRunner.submit. Cancelling stops the task if it has not started yet,
+    # and in any case makes sure its callbacks never run.
+    def __init__(self, future):
+        self.future = future
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        self.future.cancel()
+
+    def done(self):
+        return self.cancelled or self.future.done()
+
+
+class TaskRunner:
+    # Runs blocking work (bcrypt, database queries) on worker threads so the Tk event loop
+    # keeps drawing. Tk is not thread-safe, so workers never touch widgets: the event loop
+    # polls for finished tasks with after() and runs the callbacks itself.
+    def __init__(self, root, max_workers=2, poll_interval_ms=30):
+        self.root = root
+        self.poll_interval_ms = poll_interval_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-task")
+        self.pending = []
+        self.polling = False
+        self.closed = False
+
+    # Function to run fn(*args) in the background. on_success(result) or on_error(exception)
+    # runs on the Tk thread afterwards. busy_widgets are disabled while the task runs.
+    def submit(self, fn, *args, on_success=None, on_error=None, busy_widgets=()):
+        if self.closed:
+            raise RuntimeError("Task runner is shut down")
+        handle = TaskHandle(self.executor.submit(fn, *args))
+        self.pending.append((handle, on_success, on_error, tuple(busy_widgets)))
+        for widget in busy_widgets:
+            widget.configure(state="disabled")
+        self._update_busy_cursor()
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_interval_ms, self._poll)
+        return handle
+
+    # Function to cancel every task that has not reported back yet
+    def cancel_all(self):
+        for handle, _, _, _ in self.pending:
+            handle.cancel()
+
+    # Function to stop accepting work; call when the window is destroyed
+    def shutdown(self):
+        self.closed = True
+        self.cancel_all()
+        self.executor.shutdown(wait=False)
+
+    def is_busy(self):
+        return any(not handle.cancelled for handle, _, _, _ in self.pending)
+
+    def _update_busy_cursor(self):
+        try:
+            self.root.configure(cursor="watch" if self.is_busy() else "")
+        except Exception:
+            # The window may already be gone
+            pass
+
+    def _poll(self):
+        finished = [entry for entry in self.pending if entry[0].done()]
+        self.pending = [entry for entry in self.pending if not entry[0].done()]
+
+        for handle, on_success, on_error, busy_widgets in finished:
+            # Only re-enable widgets that no other pending task is still using
+            still_busy = {widget for entry in self.pending for widget in entry[3]}
+            for widget in busy_widgets:
+                if widget not in still_busy:
+                    try:
+                        widget.configure(state="normal")
+                    except Exception:
+                        pass
+            if handle.cancelled:
+                continue
+            error = handle.future.exception()
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+                else:
+                    self.root.report_callback_exception(type(error), error, error.__traceback__)
+            elif on_success is not None:
+                on_success(handle.future.result())
+
+        self._update_busy_cursor()
+        if self.pending and not self.closed:
+            self.root.after(self.poll_interval_ms, self._poll)
+        else:
+            self.polling = False
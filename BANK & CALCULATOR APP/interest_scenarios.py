@@ -0,0 +1,262 @@
+# interest_scenarios.py
+
+import csv
+import json
+import math
+import numbers
+import os
+import sys
+from array import array
+from itertools import islice, product, repeat
+
+DEFAULT_CHUNK_SIZE = 65536
+INPUT_COLUMNS = ("principal", "rate", "years", "frequency")
+RESULT_COLUMNS = INPUT_COLUMNS + ("simple_interest", "compound_interest", "continuous_interest")
+
+
+# NumPy is optional and only imported when scenarios are first evaluated
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+# Function to evaluate one chunk of scenarios. Rates are annual percentages, frequency is
+# compounding periods per year. Returns {column name: values} for RESULT_COLUMNS.
+def evaluate(principals, rates, years, frequencies, use_numpy=True):
+    np = _numpy() if use_numpy else None
+    if np is not None:
+        principal, rate, term, frequency = np.broadcast_arrays(
+            np.asarray(principals, dtype=float), np.asarray(rates, dtype=float),
+            np.asarray(years, dtype=float), np.asarray(frequencies, dtype=float),
+        )
+        if np.any(frequency <= 0):
+            raise ValueError("Compounding frequency must be positive")
+        r = rate / 100
+        return {
+            "principal": principal,
+            "rate": rate,
+            "years": term,
+            "frequency": frequency,
+            "simple_interest": principal * r * term,
+            "compound_interest": principal * np.expm1(frequency * term * np.log1p(r / frequency)),
+            "continuous_interest": principal * np.expm1(r * term),
+        }
+
+    principal, rate, term, frequency = (array("d", column) for column in _broadcast(principals, rates, years, frequencies))
+    if any(value <= 0 for value in frequency):
+        raise ValueError("Compounding frequency must be positive")
+    return {
+        "principal": principal,
+        "rate": rate,
+        "years": term,
+        "frequency": frequency,
+        "simple_interest": array("d", map(lambda p, r, t: p * r / 100 * t, principal, rate, term)),
+        "compound_interest": array("d", map(
+            lambda p, r, t, n: p * math.expm1(n * t * math.log1p(r / 100 / n)), principal, rate, term, frequency
+        )),
+        "continuous_interest": array("d", map(lambda p, r, t: p * math.expm1(r / 100 * t), principal, rate, term)),
+    }
+
+
+# Function to repeat scalar inputs so every column has the same length (pure-Python path)
+def _broadcast(*columns):
+    lengths = {len(column) for column in columns if not _is_scalar(column)}
+    if len(lengths) > 1:
+        raise ValueError("Scenario columns must all have the same length")
+    length = lengths.pop() if lengths else 1
+    return [list(repeat(column, length)) if _is_scalar(column) else column for column in columns]
+
+
+def _is_scalar(value):
+    return isinstance(value, numbers.Real)
+
+
+# Function to take the next chunk from a column: a scalar, a sliceable sequence (list,
+# array, NumPy array) or any iterator
+def _take(column, start, count):
+    if _is_scalar(column):
+        return column
+    if hasattr(column, "__getitem__") and hasattr(column, "__len__"):
+        return column[start:start + count]
+    return list(islice(column, count))
+
+
+# Function to evaluate any number of scenarios a chunk at a time, so a million-row grid
+# never has to sit in memory at once. Each input is a scalar (same for every scenario),
+# a sequence or an iterator. Yields result dicts as returned by evaluate().
+def evaluate_chunks(principals, rates, years, frequencies=12, chunk_size=DEFAULT_CHUNK_SIZE, use_numpy=True):
+    start = 0
+    columns = (principals, rates, years, frequencies)
+    if all(_is_scalar(column) for column in columns):
+        yield evaluate(*([column] for column in columns), use_numpy=use_numpy)
+        return
+    while True:
+        chunk = [_take(column, start, chunk_size) for column in columns]
+        if any(not _is_scalar(column) and len(column) == 0 for column in chunk):
+            return
+        yield evaluate(*chunk, use_numpy=use_numpy)
+        start += chunk_size
+
+
+# Function to build a sensitivity grid: every combination of the given values, returned as
+# the four input columns for evaluate_chunks
+def scenario_grid(principals, rates, years, frequencies=(12,), use_numpy=True):
+    np = _numpy() if use_numpy else None
+    if np is not None:
+        grid = np.meshgrid(
+            np.asarray(principals, dtype=float), np.asarray(rates, dtype=float),
+            np.asarray(years, dtype=float), np.asarray(frequencies, dtype=float), indexing="ij",
+        )
+        return tuple(column.ravel() for column in grid)
+    combinations = list(product(principals, rates, years, frequencies))
+    return tuple(array("d", column) for column in zip(*combinations)) if combinations else tuple(array("d") for _ in range(4))
+
+
+# CSV number formats: rands to the cent, everything else as given
+_CSV_FORMATS = {
+    "principal": "%.2f",
+    "rate": "%.10g",
+    "years": "%.10g",
+    "frequency": "%.10g",
+    "simple_interest": "%.2f",
+    "compound_interest": "%.2f",
+    "continuous_interest": "%.2f",
+}
+
+
+# Function to stream result chunks to CSV (a file name or an open text file), one chunk
+# at a time. Returns the number of scenario rows written.
+def write_csv(chunks, destination):
+    if isinstance(destination, (str, os.PathLike)):
+        with open(destination, "w", newline="") as file:
+            return write_csv(chunks, file)
+    destination.write(",".join(RESULT_COLUMNS) + "\n")
+    # One %-format per row over plain floats; faster than numpy.savetxt, which formats
+    # every row through its own Python loop anyway
+    row_format = ",".join(_CSV_FORMATS[name] for name in RESULT_COLUMNS) + "\n"
+    written = 0
+    for chunk in chunks:
+        columns = [chunk[name].tolist() for name in RESULT_COLUMNS]
+        destination.writelines(map(row_format.__mod__, zip(*columns)))
+        written += len(columns[0])
+    return written
+
+
+# Function to stream result chunks into a columnar directory: one file of little-endian
+# float64 values per column, appended chunk by chunk, and a schema.json naming the files
+# and the row count. Each column can then be loaded on its own (read_columns, or
+# numpy.fromfile) without parsing text. Returns the number of scenario rows written.
+def write_columns(chunks, directory):
+    os.makedirs(directory, exist_ok=True)
+    files = {name: open(os.path.join(directory, f"{name}.f64"), "wb") for name in RESULT_COLUMNS}
+    written = 0
+    try:
+        for chunk in chunks:
+            for name, file in files.items():
+                values = chunk[name]
+                if isinstance(values, array):
+                    if sys.byteorder == "big":
+                        values = array("d", values)
+                        values.byteswap()
+                    values.tofile(file)
+                else:
+                    values.astype("<f8", copy=False).tofile(file)
+            written += len(chunk[RESULT_COLUMNS[0]])
+    finally:
+        for file in files.values():
+            file.close()
+    schema = {
+        "rows": written,
+        "columns": [{"name": name, "dtype": "<f8", "file": f"{name}.f64"} for name in RESULT_COLUMNS],
+    }
+    with open(os.path.join(directory, "schema.json"), "w") as file:
+        json.dump(schema, file, indent=2)
+    return written
+
+
+# Function to load a directory written by write_columns; returns {column name: values}.
+# Pass columns=(...) to read only some of them.
+def read_columns(directory, columns=None, use_numpy=True):
+    with open(os.path.join(directory, "schema.json")) as file:
+        schema = json.load(file)
+    np = _numpy() if use_numpy else None
+    result = {}
+    for column in schema["columns"]:
+        if columns is not None and column["name"] not in columns:
+            continue
+        path = os.path.join(directory, column["file"])
+        if np is not None:
+            result[column["name"]] = np.fromfile(path, dtype=column["dtype"])
+        else:
+            values = array("d")
+            with open(path, "rb") as file:
+                values.fromfile(file, schema["rows"])
+            if sys.byteorder == "big":
+                values.byteswap()
+            result[column["name"]] = values
+    return result
+
+
+# Function to read scenario input columns from a CSV file with principal, rate, years
+# and (optionally) frequency columns, one chunk of rows at a time
+def read_scenarios_csv(path, chunk_size=DEFAULT_CHUNK_SIZE, default_frequency=12):
+    with open(path, newline="") as file:
+        reader = csv.DictReader(file)
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                return
+            yield (
+                [float(row["principal"]) for row in rows],
+                [float(row["rate"]) for row in rows],
+                [float(row["years"]) for row in rows],
+                [float(row.get("frequency") or default_frequency) for row in rows],
+            )
+
+
+# Function to evaluate scenarios read in chunks from a CSV file (see read_scenarios_csv)
+def evaluate_csv(path, chunk_size=DEFAULT_CHUNK_SIZE, use_numpy=True):
+    for principals, rates, years, frequencies in read_scenarios_csv(path, chunk_size):
+        yield evaluate(principals, rates, years, frequencies, use_numpy=use_numpy)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    def number_list(text):
+        return [float(value) for value in text.replace(",", " ").split()]
+
+    parser = argparse.ArgumentParser(description="Evaluate simple, compound and continuous interest for many scenarios")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="CSV file with principal, rate, years[, frequency] columns")
+    source.add_argument("--grid", action="store_true", help="evaluate every combination of the --principals, "
+                        "--rates, --years and --frequencies values")
+    parser.add_argument("--principals", type=number_list, default=[1000.0], help="grid principals, e.g. '1000 5000'")
+    parser.add_argument("--rates", type=number_list, default=[5.0], help="grid annual rates in percent")
+    parser.add_argument("--years", type=number_list, default=[1.0], help="grid terms in years")
+    parser.add_argument("--frequencies", type=number_list, default=[12.0], help="grid compounding periods per year")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--csv", help="write results to this CSV file ('-' for standard output)")
+    output.add_argument("--columns", help="write results to this directory, one binary file per column")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="scenarios evaluated at a time")
+    args = parser.parse_args()
+
+    if args.input:
+        chunks = evaluate_csv(args.input, args.chunk_size)
+    else:
+        grid = scenario_grid(args.principals, args.rates, args.years, args.frequencies)
+        chunks = evaluate_chunks(*grid, chunk_size=args.chunk_size)
+
+    started = time.perf_counter()
+    if args.columns:
+        written = write_columns(chunks, args.columns)
+    elif args.csv == "-":
+        written = write_csv(chunks, sys.stdout)
+    else:
+        written = write_csv(chunks, args.csv)
+    if args.csv != "-":
+        print(f"Evaluated {written} scenario(s) in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,268 @@
+# ledger_archive.py
+
+import os
+import threading
+from datetime import datetime, timedelta
+
+from db_access import get_pool
+from schema_migrations import migrate, move_column_to_cents
+
+ARCHIVE_SCHEMA = "archive"
+DEFAULT_RETENTION_DAYS = 365
+DEFAULT_BATCH_SIZE = 1000
+# Live and archived ledger rows together; a TEMP view, because only those can span databases
+UNIFIED_VIEW = "all_transactions"
+
+
+# Function to name the archive database that sits next to a live database
+def default_archive_path(db_file):
+    stem, extension = os.path.splitext(db_file)
+    return f"{stem}_archive{extension or '.db'}"
+
+
+# Function to attach the archive database to a connection (once) and create the unified
+# view on it. Safe to call on every use; it does nothing if the archive is already there.
+# Readers pass create=False: the archive is then only attached if its file already exists,
+# and otherwise the view covers the live database alone. Attaching ends any open
+# transaction, so a reader inside the caller's transaction is also left unattached until
+# a later call. Returns True if the archive is attached.
+def attach_archive(conn, archive_file=None, create=True):
+    databases = {row[1]: row[2] for row in conn.execute("PRAGMA database_list")}
+    if ARCHIVE_SCHEMA not in databases:
+        if archive_file is None:
+            archive_file = default_archive_path(databases["main"])
+        if not create and (conn.in_transaction or not os.path.exists(archive_file)):
+            _create_unified_view(conn, archived=False)
+            return False
+        conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archive_file,))
+        conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.journal_mode=WAL")
+        with conn:
+            conn.execute(
+                f"""CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.transactions (
+                        id INTEGER PRIMARY KEY,
+                        account_id INTEGER NOT NULL,
+                        account_number TEXT,
+                        transaction_type TEXT NOT NULL,
+                        amount_cents INTEGER NOT NULL,
+                        transaction_time DATETIME NOT NULL,
+                        archived_at DATETIME NOT NULL
+                    )"""
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_transactions_account_time "
+                f"ON transactions (account_id, transaction_time, id)"
+            )
+        _convert_archive_to_cents(conn)
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_transactions_account_id "
+            f"ON transactions (account_id, id, transaction_type, amount_cents)"
+        )
+        # A view made before the archive existed does not cover it
+        conn.execute(f"DROP VIEW IF EXISTS temp.{UNIFIED_VIEW}")
+    _create_unified_view(conn, archived=True)
+    return True
+
+
+# Function to create the unified view, over the archive too if archived is set. Created
+# on every attach rather than once with the archive, since a schema migration may drop it.
+def _create_unified_view(conn, archived):
+    live_rows = (
+        "SELECT id, account_id, transaction_type, amount_cents, transaction_time FROM main.transactions "
+        "UNION ALL "
+        "SELECT id, account_id, transaction_type, amount_cents, transaction_time FROM main.archived_transactions"
+    )
+    if not archived:
+        conn.execute(f"CREATE TEMP VIEW IF NOT EXISTS {UNIFIED_VIEW} AS {live_rows}")
+        return
+    # Rows are copied to the archive before they leave the live tables, so for a moment a
+    # row can be in both; the archive side skips those to keep the view free of repeats.
+    conn.execute(
+        f"""CREATE TEMP VIEW IF NOT EXISTS {UNIFIED_VIEW} AS
+                {live_rows}
+                UNION ALL
+                SELECT a.id, a.account_id, a.transaction_type, a.amount_cents, a.transaction_time
+                FROM {ARCHIVE_SCHEMA}.transactions a
+                WHERE NOT EXISTS (SELECT 1 FROM main.transactions t WHERE t.id = a.id)
+                  AND NOT EXISTS (SELECT 1 FROM main.archived_transactions t WHERE t.id = a.id)"""
+    )
+
+
+# The archive is its own database file, so schema_migrations does not reach it. Archives
+# written before money moved to integer cents are converted the first time they are attached.
+def _convert_archive_to_cents(conn):
+    columns = {row[1] for row in conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.table_info(transactions)")}
+    if "amount" not in columns:
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        # Another process may have converted it while we waited for the lock
+        columns = {row[1] for row in cursor.execute(f"PRAGMA {ARCHIVE_SCHEMA}.table_info(transactions)")}
+        if "amount" in columns:
+            cursor.execute(f"DROP INDEX IF EXISTS {ARCHIVE_SCHEMA}.idx_transactions_account_id")
+            move_column_to_cents(cursor, "transactions", "amount", "amount_cents", schema=ARCHIVE_SCHEMA)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+class LedgerArchiver:
+    # Moves ledger rows nobody reads day to day out of the live database and into the
+    # attached archive database: rows of closed accounts, rows older than the retention
+    # period, and rows parked in archived_transactions by earlier hard removals.
+    #
+    # Work is done in small batches so the live database is never locked for long. The
+    # two files do not commit atomically together (WAL), so each batch is first copied
+    # and committed in the archive and only then deleted from the live tables; a crash in
+    # between leaves a row in both places, never in neither, and the next batch finishes
+    # the move. run_once() drains everything that is due; start() does so periodically
+    # on a background thread.
+    def __init__(self, db_file="bankapp.db", archive_file=None, retention_days=DEFAULT_RETENTION_DAYS,
+                 batch_size=DEFAULT_BATCH_SIZE, interval=300.0):
+        self.db_file = db_file
+        self.archive_file = archive_file or default_archive_path(db_file)
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def _connection(self):
+        conn = get_pool(self.db_file).connection()
+        attach_archive(conn, self.archive_file)
+        return conn
+
+    # Function to archive everything that is due; returns the number of ledger rows moved
+    def run_once(self):
+        conn = self._connection()
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+        sources = (
+            ("transactions", self._closed_account_rows),
+            ("transactions", lambda conn: self._rows_older_than(conn, cutoff)),
+            ("archived_transactions", self._parked_rows),
+        )
+        moved = 0
+        for table, next_ids in sources:
+            while not self.stop_event.is_set():
+                ids = next_ids(conn)
+                batch = self._move_batch(conn, table, ids) if ids else 0
+                if not batch:
+                    break
+                moved += batch
+        return moved
+
+    # Rows of closed accounts, found through the (account_id, ...) index
+    def _closed_account_rows(self, conn):
+        return [row[0] for row in conn.execute(
+            "SELECT id FROM main.transactions WHERE account_id IN (SELECT id FROM main.closed_accounts) LIMIT ?",
+            (self.batch_size,),
+        )]
+
+    # The ledger is appended in time order, so the oldest rows have the lowest ids. Only
+    # that leading run is taken: it stops at the first row inside the retention period
+    # instead of scanning the whole table for stragglers.
+    def _rows_older_than(self, conn, cutoff):
+        ids = []
+        for row in conn.execute(
+            "SELECT id, transaction_time FROM main.transactions ORDER BY id LIMIT ?", (self.batch_size,)
+        ):
+            if row[1] >= cutoff:
+                break
+            ids.append(row[0])
+        return ids
+
+    # Rows left in archived_transactions by hard removals before the archive existed
+    def _parked_rows(self, conn):
+        return [row[0] for row in conn.execute(
+            "SELECT id FROM main.archived_transactions LIMIT ?", (self.batch_size,)
+        )]
+
+    def _move_batch(self, conn, table, ids):
+        placeholders = ", ".join("?" for _ in ids)
+        archived_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if table == "archived_transactions":
+            account_number = "t.account_number"
+        else:
+            account_number = (
+                "COALESCE((SELECT account_number FROM main.accounts WHERE id = t.account_id), "
+                "(SELECT account_number FROM main.closed_accounts WHERE id = t.account_id))"
+            )
+
+        # Step 1: copy into the archive and commit there
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"INSERT OR IGNORE INTO {ARCHIVE_SCHEMA}.transactions "
+                "(id, account_id, account_number, transaction_type, amount_cents, transaction_time, archived_at) "
+                f"SELECT t.id, t.account_id, {account_number}, t.transaction_type, t.amount_cents, t.transaction_time, ? "
+                f"FROM main.{table} t WHERE t.id IN ({placeholders})",
+                [archived_at] + ids,
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        # Step 2: drop from the live table only what the archive now holds
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            deleted = conn.execute(
+                f"DELETE FROM main.{table} WHERE id IN ({placeholders}) "
+                f"AND id IN (SELECT id FROM {ARCHIVE_SCHEMA}.transactions WHERE id IN ({placeholders}))",
+                ids + ids,
+            ).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return deleted
+
+    # Function to start archiving in the background every `interval` seconds
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="ledger-archiver", daemon=True)
+            self.thread.start()
+
+    # Function to ask the background thread to archive now (e.g. right after a removal)
+    def wake(self):
+        self.wake_event.set()
+
+    def _run(self):
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    moved = self.run_once()
+                    if moved:
+                        print(f"Archived {moved} ledger row(s) to {self.archive_file}")
+                except Exception as e:
+                    print(f"Ledger archiving failed: {e}")
+                self.wake_event.wait(self.interval)
+                self.wake_event.clear()
+        finally:
+            get_pool(self.db_file).release()
+
+    # Function to stop the background thread after its current batch
+    def close(self):
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move closed-account and old ledger rows to the archive database")
+    parser.add_argument("--db", default="bankapp.db", help="database file (default: bankapp.db)")
+    parser.add_argument("--archive", default=None, help="archive database file (default: <db>_archive.db)")
+    parser.add_argument("--retention-days", type=int, default=DEFAULT_RETENTION_DAYS,
+                        help=f"keep this many days of history live (default: {DEFAULT_RETENTION_DAYS})")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows moved per transaction")
+    args = parser.parse_args()
+
+    migrate(get_pool(args.db).connection())
+    archiver = LedgerArchiver(args.db, args.archive, args.retention_days, args.batch_size)
+    print(f"Archived {archiver.run_once()} ledger row(s) to {archiver.archive_file}")
@@ -0,0 +1,104 @@
+# login_throttle.py
+
+import threading
+import time
+
+MAX_TRACKED_BUCKETS = 10000
+
+
+class TokenBucket:
+    # Allows bursts of up to `capacity` attempts, refilled at `refill_per_second`
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    # Function to take one token; returns 0 on success or the seconds until one is free
+    def take(self):
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.refill_per_second
+
+    def is_full(self):
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class LoginThrottle:
+    # Decides whether a login attempt may go on to the (expensive) bcrypt check.
+    # Attempts are rate limited per username and per source with token buckets, and
+    # repeated failures lock the username out for an exponentially growing time. The
+    # lockouts live in the login_lockouts table so they survive restarts. A source is
+    # whatever tells clients apart (e.g. a remote address); callers that cannot tell
+    # them apart pass none, so one shared bucket does not throttle everybody.
+    def __init__(self, get_connection, user_capacity=5, user_refill_seconds=30,
+                 source_capacity=20, source_refill_seconds=3, lockout_threshold=5,
+                 lockout_base_seconds=30, lockout_max_seconds=3600):
+        self.get_connection = get_connection
+        self.user_capacity = user_capacity
+        self.user_refill = 1 / user_refill_seconds
+        self.source_capacity = source_capacity
+        self.source_refill = 1 / source_refill_seconds
+        self.lockout_threshold = lockout_threshold
+        self.lockout_base_seconds = lockout_base_seconds
+        self.lockout_max_seconds = lockout_max_seconds
+        self.user_buckets = {}
+        self.source_buckets = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, buckets, key, capacity, refill):
+        bucket = buckets.get(key)
+        if bucket is None:
+            # Forget idle keys (full buckets) before tracking too many
+            if len(buckets) >= MAX_TRACKED_BUCKETS:
+                for idle_key in [k for k, b in buckets.items() if b.is_full()]:
+                    del buckets[idle_key]
+            bucket = buckets[key] = TokenBucket(capacity, refill)
+        return bucket
+
+    # Function to check an attempt before verifying the password.
+    # Returns 0 if it may proceed, otherwise the number of seconds to wait.
+    def check(self, username, source=None):
+        row = self.get_connection().execute(
+            "SELECT locked_until FROM login_lockouts WHERE username=?", (username,)
+        ).fetchone()
+        if row is not None and row[0] is not None and row[0] > time.time():
+            return row[0] - time.time()
+
+        with self.lock:
+            if source is not None:
+                wait = self._bucket(self.source_buckets, source, self.source_capacity, self.source_refill).take()
+                if wait:
+                    return wait
+            return self._bucket(self.user_buckets, username, self.user_capacity, self.user_refill).take()
+
+    # Function to count a failed attempt, locking the username once failures pile up
+    def record_failure(self, username):
+        conn = self.get_connection()
+        with conn:
+            failures = conn.execute(
+                "INSERT INTO login_lockouts (username, failures, locked_until) VALUES (?, 1, NULL) "
+                "ON CONFLICT (username) DO UPDATE SET failures = failures + 1 RETURNING failures",
+                (username,),
+            ).fetchall()[0][0]
+            if failures >= self.lockout_threshold:
+                doublings = min(failures - self.lockout_threshold, 30)
+                lockout = min(self.lockout_base_seconds * 2 ** doublings, self.lockout_max_seconds)
+                conn.execute(
+                    "UPDATE login_lockouts SET locked_until=? WHERE username=?",
+                    (time.time() + lockout, username),
+                )
+
+    # Function to clear the failure count after a successful login
+    def record_success(self, username):
+        conn = self.get_connection()
+        with conn:
+            conn.execute("DELETE FROM login_lockouts WHERE username=?", (username,))
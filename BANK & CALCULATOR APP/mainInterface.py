@@ -1,49 +1,154 @@
-import subprocess
-import sys
+import os
 import tkinter as tk
 from tkinter import messagebox
+from screen_router import ScreenRouter
+
+# Window title and size for each screen
+SCREENS = {
+    "home": ("Bank App Main Interface", "400x400"),
+    "admin_login": ("ADMIN", "400x400"),
+    "admin_page": ("ADMIN HOMEPAGE", "640x520"),
+    "create_account": ("Bank App", "450x520"),
+}
 
 class MainInterface:
+    # Every screen lives in this one window and process: the router builds each screen the
+    # first time it is needed and keeps it, so switching screens takes milliseconds.
     def __init__(self, master):
         self.master = master
         self.master.title("Bank App Main Interface")
         self.master.geometry("400x400")
         self.master.configure(bg="#2C3E50")  # Set the background color of the main window
 
-        label = tk.Label(self.master, text="Welcome to the Bank App", font=("Helvetica", 16), bg="#2C3E50", fg="#ECF0F1")
+        # Session shared with every screen, so they can skip re-authentication. A session
+        # handed down in the environment is picked up when a screen first needs it.
+        self.session_token = None
+        self.db_handler = None
+        self.sessions = None
+
+        self.back_button = tk.Button(self.master, text="Back", command=self.go_home, bg="#7F8C8D", fg="white")
+
+        container = tk.Frame(self.master, bg="#2C3E50")
+        container.pack(fill="both", expand=True)
+
+        self.router = ScreenRouter(container, on_change=self.on_screen_changed)
+        self.router.register("home", self.build_home)
+        self.router.register("admin_login", self.build_admin_login)
+        self.router.register("admin_page", self.build_admin_page)
+        self.router.register("create_account", self.build_create_account)
+        self.router.show("home")
+
+    def build_home(self, container):
+        frame = tk.Frame(container, bg="#2C3E50")
+
+        label = tk.Label(frame, text="Welcome to the Bank App", font=("Helvetica", 16), bg="#2C3E50", fg="#ECF0F1")
         label.pack(pady=20)
 
         # Button to log in as a user
-        user_button = tk.Button(self.master, text="Log in as User", command=self.login_as_user, bg="#2ECC71", fg="white")
+        user_button = tk.Button(frame, text="Log in as User", command=self.login_as_user, bg="#2ECC71", fg="white")
         user_button.pack(pady=10)
 
         # Button to log in as an admin
-        admin_button = tk.Button(self.master, text="Log in as Admin", command=self.login_as_admin,  bg="#3498DB", fg="white")
+        admin_button = tk.Button(frame, text="Log in as Admin", command=self.login_as_admin,  bg="#3498DB", fg="white")
         admin_button.pack(pady=10)
 
         # Button to create a new account
-        create_account_button = tk.Button(self.master, text="Create New Account", command=self.create_account, bg="#E74C3C", fg="white")
+        create_account_button = tk.Button(frame, text="Create New Account", command=self.create_account, bg="#E74C3C", fg="white")
         create_account_button.pack(pady=10)
+        return frame
+
+    # The screen modules (and customtkinter) are only imported when a screen is first built
+    def build_admin_login(self, container):
+        from Admin_Login import AdminLoginFrame
+        return AdminLoginFrame(container, on_login=self.on_admin_login, fg_color="transparent")
+
+    def build_admin_page(self, container):
+        from Admin_Page import AdminPage, AdminPageFrame
+        return AdminPageFrame(container, AdminPage(self.get_db_handler()), on_logout=self.on_admin_logout, fg_color="transparent")
+
+    def build_create_account(self, container):
+        from create_account import BankApp
+        frame = tk.Frame(container)
+        BankApp(frame)
+        return frame
+
+    def get_db_handler(self):
+        if self.db_handler is None:
+            from Admin_Page import DatabaseHandler
+            from sessions import SessionManager
+            self.db_handler = DatabaseHandler()
+            self.sessions = SessionManager(self.db_handler.pool.connection)
+        return self.db_handler
+
+    def on_screen_changed(self, name):
+        title, geometry = SCREENS[name]
+        self.master.title(title)
+        self.master.geometry(geometry)
+        if name == "home":
+            self.back_button.pack_forget()
+        else:
+            self.back_button.pack(side="bottom", pady=10)
+
+    # Function to switch screens, reporting a screen that fails to build
+    def show_screen(self, name, description):
+        try:
+            self.router.show(name)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open {description}: {e}")
+
+    def go_home(self):
+        self.router.show("home")
 
     def login_as_user(self):
+        # There is no user screen in this window yet, so customers still get the terminal
+        # app. It runs alongside this window instead of freezing it (on Windows in a
+        # console of its own).
+        # Imported here: only the user login button starts another process
+        import subprocess
+        import sys
+        app_dir = os.path.dirname(os.path.abspath(__file__))
         try:
-            subprocess.run([sys.executable, "User_Login.py"])
+            subprocess.Popen(
+                [sys.executable, os.path.join(app_dir, "BankAppCalculator.py")],
+                cwd=app_dir,
+                creationflags=getattr(subprocess, "CREATE_NEW_CONSOLE", 0),
+            )
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open User Login Page: {e}")
 
     def login_as_admin(self):
-        try:
-            subprocess.run([sys.executable, "Admin_Login.py"])
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to open Admin Login Page: {e}")
+        from sessions import token_from_environment
+        if self.session_token is None:
+            self.session_token = token_from_environment()
+        # A live admin session goes straight to the admin page
+        if self.session_token:
+            self.get_db_handler()
+            if self.sessions.verify(self.session_token, role="admin"):
+                self.show_screen("admin_page", "Admin Page")
+                return
+        self.show_screen("admin_login", "Admin Login Page")
 
     def create_account(self):
-        try:
-            subprocess.run([sys.executable, "Create_Account.py"])
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to open Create Account Page: {e}")
+        self.show_screen("create_account", "Create Account Page")
+
+    def on_admin_login(self, session_token):
+        self.session_token = session_token
+        self.show_screen("admin_page", "Admin Page")
+
+    def on_admin_logout(self):
+        from sessions import SESSION_ENV_VAR
+        if self.session_token:
+            self.get_db_handler()
+            self.sessions.revoke(self.session_token)
+        self.session_token = None
+        os.environ.pop(SESSION_ENV_VAR, None)
+        # The admin page is rebuilt (behind a new login) next time
+        self.router.show("home")
+        self.router.discard("admin_page")
 
 if __name__ == "__main__":
     root = tk.Tk()
     main_interface = MainInterface(root)
     root.mainloop()
+    if main_interface.db_handler is not None:
+        main_interface.db_handler.close()
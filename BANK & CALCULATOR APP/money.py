@@ -0,0 +1,65 @@
+# money.py
+
+# Money is held as integer cents everywhere inside the app: in the database (INTEGER
+# *_cents columns), in postings and in ledger sums, so totals are exact and summing is
+# integer arithmetic. Rands only appear at the edges -- when an amount is typed in or
+# imported (parse_rands) and when it is printed (format_cents).
+
+CENTS_PER_RAND = 100
+
+
+class Money(int):
+    # An amount in integer cents that prints as rands (Money(123456) -> "1234.56").
+    # It is an int, so it can be compared, summed and stored in SQLite wherever cents
+    # are expected; arithmetic on it gives plain ints and runs at int speed.
+    __slots__ = ()
+
+    def __str__(self):
+        return format_cents(self)
+
+    def __repr__(self):
+        return f"Money('{format_cents(self)}')"
+
+    # Function to get the amount as a float number of rands (for estimates, not storage)
+    @property
+    def rands(self):
+        return self / CENTS_PER_RAND
+
+
+# Function to read an amount typed in rands ("150", "150.5", "R1 250.75") as Money.
+# More than two decimal places is an error rather than being rounded away.
+def parse_rands(text):
+    # Imported here: decimal is only needed at the edges, not on startup or in hot loops
+    from decimal import Decimal, InvalidOperation
+    cleaned = str(text).strip().replace(" ", "")
+    if cleaned[:1] in ("R", "r"):
+        cleaned = cleaned[1:]
+    try:
+        value = Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f"Not an amount: {text!r}") from None
+    if not value.is_finite():
+        raise ValueError(f"Not an amount: {text!r}")
+    cents = value.scaleb(2)
+    if cents != cents.to_integral_value():
+        raise ValueError("Amounts cannot have more than two decimal places")
+    return Money(cents)
+
+
+# Function to convert a number of rands (int, float or Decimal) to Money, rounding half
+# a cent away from zero. Floats are taken at their shortest decimal form, so 0.285 is
+# 29 cents even though the float itself is slightly below 0.285.
+def to_cents(rands):
+    from decimal import ROUND_HALF_UP, Decimal
+    if isinstance(rands, int):
+        return Money(rands * CENTS_PER_RAND)
+    if isinstance(rands, float):
+        rands = repr(rands)
+    return Money(Decimal(rands).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+# Function to format cents as rands with two decimals: 123456 -> "1234.56"
+def format_cents(cents):
+    sign = "-" if cents < 0 else ""
+    rands, cents = divmod(abs(int(cents)), CENTS_PER_RAND)
+    return f"{sign}{rands}.{cents:02d}"
@@ -0,0 +1,208 @@
+# posting_engine.py
+
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from db_access import get_pool
+
+# Ledger types of the two halves of an account-to-account transfer (see transfers.py)
+TRANSFER_OUT = "Transfer Out"
+TRANSFER_IN = "Transfer In"
+# Transaction types that move money into an account, and those that take it out. Postings
+# of any other type are refused rather than guessed at.
+CREDIT_TYPES = ("Deposit", "Initial Deposit", TRANSFER_IN)
+DEBIT_TYPES = ("Withdrawal", TRANSFER_OUT)
+
+UPDATE_BALANCE_SQL = (
+    "UPDATE accounts SET balance_cents = balance_cents + ? WHERE account_number=? AND balance_cents >= ? "
+    "RETURNING id, balance_cents"
+)
+INSERT_LEDGER_SQL = (
+    "INSERT INTO transactions (account_id, transaction_type, amount_cents, transaction_time) VALUES (?, ?, ?, ?)"
+)
+
+
+# Function to reject an amount that is not integer cents: a float here was never converted
+# from rands (money.parse_rands / to_cents) and would otherwise be stored as a REAL
+def check_amount(amount):
+    if not isinstance(amount, int) or isinstance(amount, bool):
+        raise TypeError(f"Posting amounts must be integer cents, not {type(amount).__name__}")
+
+
+# Function to reject a posting that could not be applied as meant: an amount that is not a
+# positive number of cents, or a transaction type that is neither a credit nor a debit
+def check_posting(transaction_type, amount):
+    check_amount(amount)
+    if amount <= 0:
+        raise ValueError("Posting amounts must be positive")
+    if transaction_type not in CREDIT_TYPES and transaction_type not in DEBIT_TYPES:
+        raise ValueError(f"Unknown transaction type: {transaction_type!r}")
+
+
+class PostingEngine:
+    def __init__(self, conn):
+        self.conn = conn
+
+    # Function to apply a deposit or withdrawal to an account in one transaction.
+    # The balance is changed in place by a single conditional UPDATE, so two tellers
+    # posting to the same account can never overwrite each other's result.
+    # Amounts are integer cents (see money.py). Returns the new balance in cents, or None
+    # if the account is missing or has insufficient funds.
+    def post(self, account_number, transaction_type, amount):
+        return self.post_batch([(account_number, transaction_type, amount)])[0]
+
+    # Function to apply many (account_number, transaction_type, amount) postings under a
+    # single commit. Each posting succeeds or fails on its own; the returned list holds the
+    # new balance (or None) for every posting, in input order. Inside a transaction the
+    # caller already has open, the postings join it and are left for the caller to commit.
+    def post_batch(self, postings):
+        # Checked before the write lock is taken
+        for _, transaction_type, amount in postings:
+            check_posting(transaction_type, amount)
+        transaction_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        results = []
+        ledger_rows = []
+        started = not self.conn.in_transaction
+        cursor = self.conn.cursor()
+        try:
+            # Take the write lock up front so the updates and ledger inserts commit together;
+            # in the caller's transaction, a savepoint lets a failure undo just this batch
+            cursor.execute("BEGIN IMMEDIATE" if started else "SAVEPOINT post_batch")
+
+            for account_number, transaction_type, amount in postings:
+                if transaction_type in CREDIT_TYPES:
+                    delta, minimum_balance = amount, 0
+                else:
+                    delta, minimum_balance = -amount, amount
+
+                rows = cursor.execute(
+                    UPDATE_BALANCE_SQL, (delta, account_number, minimum_balance)
+                ).fetchall()
+                if rows:
+                    account_id, new_balance = rows[0]
+                    ledger_rows.append((account_id, transaction_type, amount, transaction_time))
+                    results.append(new_balance)
+                else:
+                    results.append(None)
+
+            cursor.executemany(INSERT_LEDGER_SQL, ledger_rows)
+            if started:
+                self.conn.commit()
+            else:
+                cursor.execute("RELEASE post_batch")
+            return results
+        except sqlite3.Error:
+            if started:
+                self.conn.rollback()
+            else:
+                cursor.execute("ROLLBACK TO post_batch")
+                cursor.execute("RELEASE post_batch")
+            raise
+
+
+class GroupCommitter:
+    # Queues postings from many callers and writes them from one background thread,
+    # committing every max_delay_ms milliseconds or every max_batch postings,
+    # whichever comes first. Each caller gets a Future with its own result.
+    #
+    # Every queued Future is always settled: a batch that fails fails its own Futures, and
+    # if the writer cannot carry on (e.g. no connection could be had) it fails everything
+    # still queued and closes, so no caller waits forever. Once closed, submit raises.
+    def __init__(self, db_name, max_delay_ms=10, max_batch=500):
+        self.db_name = db_name
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        # Guards closed, so nothing can be queued behind the stop marker
+        self.lock = threading.Lock()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self.thread.start()
+
+    # Function to queue a posting and return a Future for its new balance
+    def submit(self, account_number, transaction_type, amount):
+        # Imported here: only group commit needs concurrent.futures
+        from concurrent.futures import Future
+        # Checked here, in the caller's thread, so a bad posting cannot reach the writer
+        check_posting(transaction_type, amount)
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Group committer is closed")
+            self.queue.put((future, (account_number, transaction_type, amount)))
+        return future
+
+    # Function to queue a posting and wait for it to be committed
+    def post(self, account_number, transaction_type, amount):
+        return self.submit(account_number, transaction_type, amount).result()
+
+    # Function to flush the remaining postings and stop the writer thread
+    def close(self):
+        with self.lock:
+            if not self.closed:
+                self.closed = True
+                self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        # The writer thread keeps one pooled connection for its whole life
+        pool = get_pool(self.db_name)
+        try:
+            engine = PostingEngine(pool.connection())
+        except Exception as e:
+            self._fail_pending(e)
+            return
+        try:
+            self._write(engine)
+        except Exception as e:
+            self._fail_pending(e)
+        finally:
+            pool.release()
+
+    def _write(self, engine):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            futures = [future for future, _ in batch]
+            try:
+                results = engine.post_batch([posting for _, posting in batch])
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+
+    # Function to close the committer after the writer hit an error it cannot get past,
+    # failing every posting still queued with that error
+    def _fail_pending(self, error):
+        with self.lock:
+            self.closed = True
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                item[0].set_exception(error)
@@ -0,0 +1,107 @@
+# quote_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_SECONDS = 900.0
+# Inputs that differ only past this many decimal places are the same quote
+DEFAULT_PRECISION = 6
+
+
+class QuoteCache:
+    # Remembers calculator quotes so repeated questions (standard house prices, standard
+    # terms, the usual rates) are answered with a dictionary lookup instead of being
+    # worked out again. Entries are keyed on the quote kind and the normalized inputs,
+    # rates included, so a quote at a different rate is simply a different entry; the
+    # least recently used entry is dropped once max_entries is reached and every entry
+    # expires ttl seconds after it was computed.
+    #
+    # Cached values are shared between callers and must be treated as read-only.
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS,
+                 precision=DEFAULT_PRECISION, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.precision = precision
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # Function to turn inputs into a key: floats rounded to `precision` places (so
+    # 250000, 250000.0 and 250000.0000001 are one quote), text trimmed and lower-cased
+    def normalize(self, value):
+        if isinstance(value, float):
+            return round(value, self.precision)
+        if isinstance(value, str):
+            return value.strip().lower()
+        if isinstance(value, dict):
+            return tuple(sorted((self.normalize(k), self.normalize(v)) for k, v in value.items()))
+        if isinstance(value, (list, tuple)):
+            return tuple(self.normalize(item) for item in value)
+        return value
+
+    # Function to return the cached quote for (kind, inputs), computing and storing it on
+    # a miss. compute is called with the normalized inputs, so a cached answer is always
+    # exactly what compute gives for them.
+    def quote(self, kind, compute, *inputs):
+        inputs = tuple(self.normalize(value) for value in inputs)
+        with self.lock:
+            key = (kind,) + inputs
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self.clock():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        # Computed outside the lock; two callers missing at once both compute, which is
+        # cheaper than making every caller wait behind one
+        value = compute(*inputs)
+        with self.lock:
+            self.entries[key] = (self.clock() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    # Function to drop every cached quote
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    # Function to report the counters, e.g. for monitoring the hit rate at peak
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+# Function to get the process-wide quote cache, creating it on first use. Options only
+# take effect when the cache is created.
+def get_quote_cache(**options):
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = QuoteCache(**options)
+        return _shared_cache
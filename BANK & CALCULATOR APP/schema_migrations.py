@@ -0,0 +1,390 @@
+# schema_migrations.py
+
+# Every class that opens bankapp.db shares this list. Each migration runs exactly once per
+# database file; the number of the last applied migration is kept in PRAGMA user_version.
+# Never edit a migration that has shipped -- append a new one instead.
+
+
+def create_baseline_tables(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS users
+                          (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password TEXT,
+                          balance REAL, account_number TEXT UNIQUE)"""
+    )
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS transactions
+                          (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, transaction_type TEXT,
+                          amount REAL, transaction_time DATETIME)"""
+    )
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS admins
+                          (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password TEXT)"""
+    )
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS accounts (
+                account_number TEXT PRIMARY KEY,
+                username TEXT,
+                salt TEXT,
+                hashed_password TEXT,
+                balance REAL
+            )"""
+    )
+
+
+# Function to list the column names of a table (empty if the table does not exist)
+def get_columns(cursor, table):
+    return [row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+# The CLI wrote users + transactions(username, ...), while the Tk screens wrote
+# accounts + transactions(account_number, ...) into the same file. Fold both into one
+# schema keyed by an integer account id, with the ledger indexed per account and time.
+def unify_account_schema(cursor):
+    users_columns = get_columns(cursor, "users")
+    accounts_columns = get_columns(cursor, "accounts")
+    transactions_columns = get_columns(cursor, "transactions")
+
+    # Rename the ledger first so its foreign key follows the accounts table it points at
+    if transactions_columns:
+        cursor.execute("ALTER TABLE transactions RENAME TO legacy_transactions")
+    if accounts_columns:
+        cursor.execute("ALTER TABLE accounts RENAME TO legacy_accounts")
+    if users_columns:
+        cursor.execute("ALTER TABLE users RENAME TO legacy_users")
+
+    cursor.execute(
+        """CREATE TABLE accounts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                account_number TEXT NOT NULL UNIQUE,
+                username TEXT NOT NULL,
+                password TEXT,
+                balance REAL NOT NULL DEFAULT 0
+            )"""
+    )
+    cursor.execute("CREATE INDEX idx_accounts_username ON accounts (username)")
+    cursor.execute(
+        """CREATE TABLE transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                account_id INTEGER NOT NULL REFERENCES accounts (id),
+                transaction_type TEXT NOT NULL,
+                amount REAL NOT NULL,
+                transaction_time DATETIME NOT NULL
+            )"""
+    )
+    # Covers per-account history queries ordered by time without touching the table
+    cursor.execute(
+        """CREATE INDEX idx_transactions_account_time
+                ON transactions (account_id, transaction_time, id, transaction_type, amount)"""
+    )
+
+    # CLI users win if the same account number was also written by the Tk screens
+    if users_columns:
+        cursor.execute(
+            """INSERT INTO accounts (account_number, username, password, balance)
+                    SELECT account_number, username, password, COALESCE(balance, 0)
+                    FROM legacy_users WHERE account_number IS NOT NULL ORDER BY id"""
+        )
+    if accounts_columns:
+        password_column = "hashed_password" if "hashed_password" in accounts_columns else "password"
+        cursor.execute(
+            f"""INSERT OR IGNORE INTO accounts (account_number, username, password, balance)
+                    SELECT account_number, COALESCE(username, ''), {password_column}, COALESCE(balance, 0)
+                    FROM legacy_accounts WHERE account_number IS NOT NULL ORDER BY rowid"""
+        )
+
+    if transactions_columns:
+        if "username" in transactions_columns:
+            # CLI ledger rows only carry the username of a legacy users row
+            match = """FROM legacy_transactions t
+                    JOIN legacy_users u ON u.username = t.username
+                    JOIN accounts a ON a.account_number = u.account_number"""
+            select = "a.id, t.transaction_type, t.amount, t.transaction_time"
+        else:
+            match = """FROM legacy_transactions t
+                    JOIN accounts a ON a.account_number = t.account_number"""
+            select = "a.id, t.description, t.amount, t.timestamp"
+        cursor.execute(
+            f"""INSERT INTO transactions (account_id, transaction_type, amount, transaction_time)
+                    SELECT {select} {match}
+                    WHERE typeof(t.amount) IN ('integer', 'real') ORDER BY t.rowid"""
+        )
+        matched_ids = [
+            row[0] for row in cursor.execute(
+                f"SELECT t.rowid {match} WHERE typeof(t.amount) IN ('integer', 'real')"
+            ).fetchall()
+        ]
+
+        # Keep anything that could not be attributed to an account for manual review
+        cursor.executemany(
+            "DELETE FROM legacy_transactions WHERE rowid=?", [(row_id,) for row_id in matched_ids]
+        )
+        if cursor.execute("SELECT COUNT(*) FROM legacy_transactions").fetchone()[0]:
+            cursor.execute("ALTER TABLE legacy_transactions RENAME TO legacy_unmatched_transactions")
+        else:
+            cursor.execute("DROP TABLE legacy_transactions")
+
+    if accounts_columns:
+        cursor.execute("DROP TABLE legacy_accounts")
+    if users_columns:
+        cursor.execute("DROP TABLE legacy_users")
+
+
+# Replaces the free-text bankdata.txt with a table indexed on both lookup keys
+def create_account_registry(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS account_registry (
+                account_number TEXT PRIMARY KEY,
+                username TEXT NOT NULL,
+                registered_at DATETIME NOT NULL
+            ) WITHOUT ROWID"""
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_account_registry_username ON account_registry (username)"
+    )
+
+
+# Counter behind account_numbers.AccountNumberAllocator
+def create_account_number_sequence(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS account_number_sequence (
+                name TEXT PRIMARY KEY,
+                next_value INTEGER NOT NULL
+            )"""
+    )
+    cursor.execute("INSERT OR IGNORE INTO account_number_sequence (name, next_value) VALUES ('accounts', 0)")
+
+
+# Failed-login counters and lockouts used by login_throttle.LoginThrottle
+def create_login_lockouts(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS login_lockouts (
+                username TEXT PRIMARY KEY,
+                failures INTEGER NOT NULL,
+                locked_until REAL
+            )"""
+    )
+
+
+# Server-side record of session tokens issued by sessions.SessionManager
+def create_sessions(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                subject TEXT NOT NULL,
+                role TEXT NOT NULL,
+                expires_at INTEGER NOT NULL
+            )"""
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)")
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS app_secrets (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )"""
+    )
+
+
+# Covering indexes so the admin user list can sort by any column, and search by
+# username or account number prefix, reading only the rows it shows
+def create_admin_list_indexes(cursor):
+    cursor.execute("DROP INDEX IF EXISTS idx_accounts_username")
+    cursor.execute("CREATE INDEX idx_accounts_username ON accounts (username, account_number, balance)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_accounts_balance ON accounts (balance, account_number, username)")
+
+
+# Ledger rows of removed accounts are kept here instead of being deleted
+def create_archived_transactions(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS archived_transactions (
+                id INTEGER PRIMARY KEY,
+                account_id INTEGER NOT NULL,
+                account_number TEXT NOT NULL,
+                transaction_type TEXT NOT NULL,
+                amount REAL NOT NULL,
+                transaction_time DATETIME NOT NULL,
+                archived_at DATETIME NOT NULL
+            )"""
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archived_transactions_account "
+        "ON archived_transactions (account_number, transaction_time)"
+    )
+
+
+# Removed accounts are kept here (soft delete) so a removal can be undone; their ledger
+# rows are moved to the archive database by ledger_archive.LedgerArchiver
+def create_closed_accounts(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS closed_accounts (
+                id INTEGER PRIMARY KEY,
+                account_number TEXT NOT NULL UNIQUE,
+                username TEXT NOT NULL,
+                password TEXT,
+                balance REAL NOT NULL,
+                closed_at DATETIME NOT NULL
+            )"""
+    )
+    # Lets the unified history view read parked rows by account, like the live ledger
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archived_transactions_account_time "
+        "ON archived_transactions (account_id, transaction_time, id)"
+    )
+
+
+# Trusted per-account ledger balances (as of a transaction id) so verification only has
+# to sum the ledger rows that came after them, plus a record of any drift found
+def create_balance_checkpoints(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS balance_checkpoints (
+                account_id INTEGER PRIMARY KEY,
+                transaction_id INTEGER NOT NULL,
+                balance REAL NOT NULL,
+                checkpointed_at DATETIME NOT NULL
+            )"""
+    )
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS balance_drift (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                account_id INTEGER NOT NULL,
+                stored_balance REAL NOT NULL,
+                ledger_balance REAL NOT NULL,
+                transaction_id INTEGER NOT NULL,
+                detected_at DATETIME NOT NULL
+            )"""
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_balance_drift_account ON balance_drift (account_id, detected_at)")
+    # "Rows of this account after id N" is a range scan on this index
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_transactions_account_id "
+        "ON transactions (account_id, id, transaction_type, amount)"
+    )
+
+
+# Function to replace a REAL rands column with an INTEGER cents column, converting every
+# row (half a cent rounds away from zero). Indexes on the old column must be dropped first.
+def move_column_to_cents(cursor, table, column, cents_column, schema="main", not_null=True):
+    constraint = " NOT NULL DEFAULT 0" if not_null else ""
+    cursor.execute(f"ALTER TABLE {schema}.{table} ADD COLUMN {cents_column} INTEGER{constraint}")
+    cursor.execute(
+        f"UPDATE {schema}.{table} SET {cents_column} = CAST(ROUND({column} * 100) AS INTEGER) "
+        f"WHERE {column} IS NOT NULL"
+    )
+    cursor.execute(f"ALTER TABLE {schema}.{table} DROP COLUMN {column}")
+
+
+# Money is stored as integer cents (see money.py) instead of REAL rands, so balances and
+# ledger sums are exact. Columns are renamed to *_cents so nothing can read cents as rands.
+def convert_money_to_cents(cursor):
+    # The unified history view reads transactions.amount; it is recreated on next use
+    cursor.execute("DROP VIEW IF EXISTS temp.all_transactions")
+    for index in ("idx_accounts_username", "idx_accounts_balance",
+                  "idx_transactions_account_time", "idx_transactions_account_id"):
+        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+
+    move_column_to_cents(cursor, "accounts", "balance", "balance_cents")
+    move_column_to_cents(cursor, "closed_accounts", "balance", "balance_cents")
+    move_column_to_cents(cursor, "transactions", "amount", "amount_cents")
+    move_column_to_cents(cursor, "archived_transactions", "amount", "amount_cents")
+    move_column_to_cents(cursor, "balance_checkpoints", "balance", "balance_cents")
+    move_column_to_cents(cursor, "balance_drift", "stored_balance", "stored_balance_cents")
+    move_column_to_cents(cursor, "balance_drift", "ledger_balance", "ledger_balance_cents")
+
+    cursor.execute("CREATE INDEX idx_accounts_username ON accounts (username, account_number, balance_cents)")
+    cursor.execute("CREATE INDEX idx_accounts_balance ON accounts (balance_cents, account_number, username)")
+    cursor.execute(
+        """CREATE INDEX idx_transactions_account_time
+                ON transactions (account_id, transaction_time, id, transaction_type, amount_cents)"""
+    )
+    cursor.execute(
+        "CREATE INDEX idx_transactions_account_id ON transactions (account_id, id, transaction_type, amount_cents)"
+    )
+
+
+# One row per completed account-to-account transfer (see transfers.TransferEngine), keyed
+# on the caller's idempotency key so a retried transfer is applied only once
+def create_transfers(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS transfers (
+                idempotency_key TEXT PRIMARY KEY,
+                from_account_id INTEGER NOT NULL,
+                to_account_id INTEGER NOT NULL,
+                amount_cents INTEGER NOT NULL,
+                from_balance_cents INTEGER NOT NULL,
+                to_balance_cents INTEGER NOT NULL,
+                debit_transaction_id INTEGER NOT NULL,
+                credit_transaction_id INTEGER NOT NULL,
+                created_at DATETIME NOT NULL
+            ) WITHOUT ROWID"""
+    )
+
+
+# The session signing key used to be generated into app_secrets; it now lives in a file
+# of its own (see sessions.load_or_create_secret), so the copy in the database is dropped
+def drop_app_secrets(cursor):
+    cursor.execute("DROP TABLE IF EXISTS app_secrets")
+
+
+# (version, description, function taking a cursor)
+MIGRATIONS = [
+    (1, "baseline tables", create_baseline_tables),
+    (2, "unified accounts and transactions schema", unify_account_schema),
+    (3, "account registry", create_account_registry),
+    (4, "account number sequence", create_account_number_sequence),
+    (5, "login lockouts", create_login_lockouts),
+    (6, "sessions", create_sessions),
+    (7, "admin user list indexes", create_admin_list_indexes),
+    (8, "archived transactions", create_archived_transactions),
+    (9, "closed accounts", create_closed_accounts),
+    (10, "balance checkpoints", create_balance_checkpoints),
+    (11, "money as integer cents", convert_money_to_cents),
+    (12, "transfers", create_transfers),
+    (13, "session secret moved out of the database", drop_app_secrets),
+]
+
+
+# Function to read the schema version of a database
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+# Function to bring a database up to the latest schema version. Returns the versions this
+# call applied (empty if the database was already current); it prints nothing, since it
+# runs from every entry point including the GUI ones.
+def migrate(conn, migrations=MIGRATIONS):
+    applied = []
+    for version, description, apply in migrations:
+        if version <= get_schema_version(conn):
+            continue
+
+        cursor = conn.cursor()
+        try:
+            # Lock the database before re-checking the version, so two processes
+            # starting at the same time cannot both apply the same migration
+            cursor.execute("BEGIN IMMEDIATE")
+            if version > get_schema_version(conn):
+                apply(cursor)
+                cursor.execute(f"PRAGMA user_version = {int(version)}")
+                applied.append(version)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return applied
+
+
+if __name__ == "__main__":
+    import argparse
+    from db_access import get_pool
+
+    parser = argparse.ArgumentParser(description="Upgrade a database to the latest schema version")
+    parser.add_argument("--db", default="bankapp.db", help="database file (default: bankapp.db)")
+    args = parser.parse_args()
+
+    pool = get_pool(args.db)
+    conn = pool.connection()
+    descriptions = {version: description for version, description, _ in MIGRATIONS}
+    for version in migrate(conn):
+        print(f"Applied schema migration {version}: {descriptions[version]}")
+    print(f"Schema version: {get_schema_version(conn)}")
+    pool.close()
@@ -0,0 +1,43 @@
+# screen_router.py
+
+
+class ScreenRouter:
+    # Shows one screen at a time inside a container widget. A screen is built by its
+    # factory the first time it is shown and then cached, so coming back to it only
+    # re-packs an existing frame instead of building (or launching) anything.
+    def __init__(self, container, on_change=None):
+        self.container = container
+        self.on_change = on_change
+        self.factories = {}
+        self.screens = {}
+        self.current = None
+
+    # Function to register factory(container), which builds and returns the screen's frame
+    def register(self, name, factory):
+        self.factories[name] = factory
+
+    # Function to switch to a screen, building it first if it is not cached
+    def show(self, name):
+        if name not in self.factories:
+            raise KeyError(f"Unknown screen: {name}")
+        screen = self.screens.get(name)
+        if screen is None or not screen.winfo_exists():
+            screen = self.screens[name] = self.factories[name](self.container)
+
+        previous = self.screens.get(self.current)
+        if previous is not None and previous is not screen and previous.winfo_exists():
+            previous.pack_forget()
+        screen.pack(fill="both", expand=True)
+        self.current = name
+
+        if self.on_change is not None:
+            self.on_change(name)
+        return screen
+
+    # Function to drop a cached screen so it is built afresh next time (e.g. after logout)
+    def discard(self, name):
+        screen = self.screens.pop(name, None)
+        if self.current == name:
+            self.current = None
+        if screen is not None and screen.winfo_exists():
+            screen.destroy()
@@ -0,0 +1,136 @@
+# sessions.py
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+
+DEFAULT_TTL_SECONDS = 15 * 60
+# Windows started from the main interface find their session here
+SESSION_ENV_VAR = "BANKAPP_SESSION_TOKEN"
+
+
+def _encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+# Function to read a session token handed down by the process that started this one
+def token_from_environment():
+    return os.environ.get(SESSION_ENV_VAR) or None
+
+
+# Function to name the file holding the generated signing key, next to its database
+def default_secret_path(db_file):
+    stem, _ = os.path.splitext(db_file)
+    return f"{stem}_session.key"
+
+
+# Function to read the signing key from secret_file, generating it the first time. The
+# file is only readable by its owner, and is written under a temporary name and linked
+# into place so two processes starting together cannot end up with different keys.
+def load_or_create_secret(secret_file):
+    if not os.path.exists(secret_file):
+        temporary = f"{secret_file}.{os.getpid()}.tmp"
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            try:
+                os.link(temporary, secret_file)
+            except FileExistsError:
+                pass
+        finally:
+            os.remove(temporary)
+    with open(secret_file) as f:
+        return f.read().strip()
+
+
+class SessionManager:
+    # Issues signed, expiring session tokens so a user who has already logged in can move
+    # between screens (and processes) without another bcrypt check. A token is
+    # payload.signature, where the signature is an HMAC-SHA256 of the payload; checking
+    # it takes microseconds. Sessions are also kept in the sessions table so they can be
+    # revoked on logout, and expired rows are evicted as new sessions are issued.
+    def __init__(self, get_connection, ttl_seconds=DEFAULT_TTL_SECONDS, secret=None, secret_file=None):
+        self.get_connection = get_connection
+        self.ttl_seconds = ttl_seconds
+        self._secret = secret.encode("utf-8") if isinstance(secret, str) else secret
+        self.secret_file = secret_file
+
+    # The signing key comes from BANKAPP_SESSION_SECRET, or is generated once per
+    # database and kept in a file of its own (see load_or_create_secret), never in the
+    # database, so every process that opens the database agrees on the same key
+    def secret(self):
+        if self._secret is None:
+            configured = os.environ.get("BANKAPP_SESSION_SECRET")
+            if configured:
+                self._secret = configured.encode("utf-8")
+            else:
+                secret_file = self.secret_file
+                if secret_file is None:
+                    db_file = self.get_connection().execute("PRAGMA database_list").fetchone()[2]
+                    if not db_file:
+                        raise RuntimeError(
+                            "BANKAPP_SESSION_SECRET must be set for sessions on an in-memory database"
+                        )
+                    secret_file = default_secret_path(db_file)
+                self._secret = load_or_create_secret(secret_file).encode("utf-8")
+        return self._secret
+
+    def _sign(self, payload):
+        return _encode(hmac.new(self.secret(), payload.encode("utf-8"), hashlib.sha256).digest())
+
+    # Function to start a session for a user or admin and return its token
+    def issue(self, subject, role="user"):
+        session_id = secrets.token_urlsafe(16)
+        expires_at = int(time.time()) + self.ttl_seconds
+        payload = _encode(json.dumps(
+            {"sid": session_id, "sub": subject, "role": role, "exp": expires_at},
+            separators=(",", ":"),
+        ).encode("utf-8"))
+        conn = self.get_connection()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (int(time.time()),))
+            conn.execute(
+                "INSERT INTO sessions (session_id, subject, role, expires_at) VALUES (?, ?, ?, ?)",
+                (session_id, str(subject), role, expires_at),
+            )
+        return f"{payload}.{self._sign(payload)}"
+
+    # Function to check a token; returns its claims ({"sub", "role", ...}) or None
+    def verify(self, token, role=None):
+        if not token or token.count(".") != 1:
+            return None
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature.encode("utf-8"), self._sign(payload).encode("utf-8")):
+            return None
+        try:
+            claims = json.loads(_decode(payload))
+        except ValueError:
+            return None
+        if not isinstance(claims, dict) or claims.get("exp", 0) <= time.time():
+            return None
+        if role is not None and claims.get("role") != role:
+            return None
+        # A valid signature is not enough if the session was revoked (e.g. by logout)
+        row = self.get_connection().execute(
+            "SELECT 1 FROM sessions WHERE session_id=? AND expires_at > ?", (claims["sid"], int(time.time()))
+        ).fetchone()
+        return claims if row else None
+
+    # Function to end a session (logout)
+    def revoke(self, token):
+        claims = self.verify(token)
+        if claims is None:
+            return False
+        conn = self.get_connection()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE session_id=?", (claims["sid"],))
+        return True
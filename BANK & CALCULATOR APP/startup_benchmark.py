@@ -0,0 +1,96 @@
+# startup_benchmark.py
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Import-time budget per entry point, in milliseconds. The median over several cold
+# interpreter runs has to stay under these or the benchmark fails.
+DEFAULT_BUDGETS_MS = {
+    "BankAppCalculator": 80,
+    "mainInterface": 60,
+    "Admin_Login": 200,
+}
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Function to parse `python -X importtime` output into {module: (self_us, cumulative_us)}
+def parse_importtime(output):
+    timings = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # The header line
+        module = fields[2].strip()
+        timings[module] = (int(fields[0]), int(fields[1]))
+    return timings
+
+
+# Function to import one entry point in a fresh interpreter; returns its importtime table
+def measure(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip()[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+# Function to benchmark one entry point; returns (median ms, slowest imports of the last run)
+def benchmark(module, runs, top):
+    totals = []
+    timings = {}
+    for _ in range(runs):
+        timings = measure(module)
+        totals.append(timings[module][1] / 1000)
+    slowest = sorted(
+        ((name, self_us / 1000) for name, (self_us, _) in timings.items() if name != module),
+        key=lambda item: item[1], reverse=True,
+    )[:top]
+    return statistics.median(totals), slowest
+
+
+def parse_budget(text):
+    module, _, budget = text.partition("=")
+    if not module or not budget:
+        raise argparse.ArgumentTypeError("expected MODULE=MILLISECONDS")
+    return module, float(budget)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check entry point import times against their budgets")
+    parser.add_argument("--runs", type=int, default=5, help="interpreter runs per entry point (default: 5)")
+    parser.add_argument("--top", type=int, default=5, help="slowest imports to list per entry point")
+    parser.add_argument("--budget", type=parse_budget, action="append", default=[],
+                        metavar="MODULE=MS", help="override (or add) an entry point budget")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply every budget, for slower or faster machines")
+    args = parser.parse_args()
+
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    budgets.update(args.budget)
+
+    failed = []
+    for module, budget in budgets.items():
+        budget *= args.scale
+        try:
+            median_ms, slowest = benchmark(module, args.runs, args.top)
+        except RuntimeError as e:
+            print(e)
+            failed.append(module)
+            continue
+        status = "ok" if median_ms <= budget else "OVER BUDGET"
+        print(f"{module}: {median_ms:.1f} ms (budget {budget:.0f} ms) {status}")
+        for name, self_ms in slowest:
+            print(f"    {self_ms:7.1f} ms  {name}")
+        if median_ms > budget:
+            failed.append(module)
+
+    if failed:
+        print(f"Startup regression in: {', '.join(failed)}")
+        sys.exit(1)
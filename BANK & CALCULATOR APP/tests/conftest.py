@@ -0,0 +1,53 @@
+# conftest.py
+
+import os
+import sys
+
+import pytest
+
+# The app is a folder of flat modules run from its own directory
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from db_access import get_pool  # noqa: E402
+from schema_migrations import migrate  # noqa: E402
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "bankapp.db")
+    yield path
+    get_pool(path).close()
+
+
+# A migrated database and this thread's pooled connection to it
+@pytest.fixture
+def conn(db_file):
+    conn = get_pool(db_file).connection()
+    migrate(conn)
+    return conn
+
+
+# Function to open an account directly, returning its id
+def open_account(conn, account_number, balance_cents=0, username="tester"):
+    with conn:
+        return conn.execute(
+            "INSERT INTO accounts (account_number, username, balance_cents) VALUES (?, ?, ?)",
+            (account_number, username, balance_cents),
+        ).lastrowid
+
+
+# Function to read an account's balance in cents
+def balance_of(conn, account_number):
+    return conn.execute("SELECT balance_cents FROM accounts WHERE account_number=?", (account_number,)).fetchone()[0]
+
+
+# Function to sum an account's ledger rows as signed cents
+def ledger_total(conn, account_number):
+    from posting_engine import CREDIT_TYPES
+    rows = conn.execute(
+        "SELECT t.transaction_type, t.amount_cents FROM transactions t JOIN accounts a ON a.id = t.account_id "
+        "WHERE a.account_number=?",
+        (account_number,),
+    ).fetchall()
+    return sum(amount if transaction_type in CREDIT_TYPES else -amount for transaction_type, amount in rows)
@@ -0,0 +1,61 @@
+# test_account_numbers.py
+
+from itertools import chain
+
+from conftest import open_account
+from account_numbers import BODY_SPACE, AccountNumberAllocator, is_valid_account_number, luhn_check_digit
+
+
+def test_luhn_check_digit():
+    assert luhn_check_digit("7992739871") == "3"
+    assert is_valid_account_number("0000000000")
+    assert is_valid_account_number("4000000001") is False
+    assert is_valid_account_number("123") is False
+
+
+def test_permutation_is_one_to_one_and_in_range(conn):
+    allocator = AccountNumberAllocator(conn)
+    # The start and end of the counter space, where cycle walking does most of its work
+    counters = list(chain(range(0, 100000), range(BODY_SPACE - 100000, BODY_SPACE)))
+    bodies = [allocator.permute(counter) for counter in counters]
+    assert len(set(bodies)) == len(counters)
+    assert all(0 <= body < BODY_SPACE for body in bodies)
+
+
+def test_formatted_numbers_carry_a_valid_check_digit(conn):
+    allocator = AccountNumberAllocator(conn)
+    for counter in range(0, 5000):
+        account_number = allocator.format_account_number(counter)
+        assert len(account_number) == 10
+        assert is_valid_account_number(account_number)
+
+
+def test_different_keys_give_different_orders(conn):
+    first = AccountNumberAllocator(conn, key="one")
+    second = AccountNumberAllocator(conn, key="two")
+    assert [first.permute(c) for c in range(10)] != [second.permute(c) for c in range(10)]
+
+
+def test_reserved_blocks_never_repeat(conn):
+    allocator = AccountNumberAllocator(conn)
+    numbers = allocator.reserve_block(1000) + allocator.reserve_block(1000) + [allocator.allocate()]
+    assert len(set(numbers)) == 2001
+
+
+# Numbers handed out before the allocator existed may collide with ones it would issue;
+# those are skipped whether the account is open or closed
+def test_reserve_block_skips_numbers_already_taken(conn):
+    allocator = AccountNumberAllocator(conn)
+    next_counter = conn.execute("SELECT next_value FROM account_number_sequence").fetchone()[0]
+    taken_open = allocator.format_account_number(next_counter)
+    taken_closed = allocator.format_account_number(next_counter + 1)
+    open_account(conn, taken_open)
+    with conn:
+        conn.execute(
+            "INSERT INTO closed_accounts (account_number, username, balance_cents, closed_at) "
+            "VALUES (?, 'old', 0, '2020-01-01 00:00:00')",
+            (taken_closed,),
+        )
+    block = allocator.reserve_block(10)
+    assert len(block) == len(set(block)) == 10
+    assert taken_open not in block and taken_closed not in block
@@ -0,0 +1,58 @@
+# test_account_removal.py
+
+import sqlite3
+
+import pytest
+
+from account_removal import AccountRemover
+from conftest import open_account
+
+
+def account_numbers(conn, table):
+    return {row[0] for row in conn.execute(f"SELECT account_number FROM {table}")}
+
+
+def test_remove_and_restore(conn):
+    open_account(conn, "1000000001", 500, "alice")
+    open_account(conn, "1000000002", 0, "bob")
+    remover = AccountRemover(conn)
+    removed, missing = remover.remove_accounts(["1000000001", " 1000000001 ", "9999999999"])
+    assert removed == [("1000000001", "alice", 500)]
+    assert missing == ["9999999999"]
+    assert account_numbers(conn, "accounts") == {"1000000002"}
+    assert account_numbers(conn, "closed_accounts") == {"1000000001"}
+
+    restored, missing = remover.restore_accounts(["1000000001"])
+    assert restored == [("1000000001", "alice", 500)] and missing == []
+    assert account_numbers(conn, "accounts") == {"1000000001", "1000000002"}
+    assert account_numbers(conn, "closed_accounts") == set()
+
+
+def test_removal_inside_callers_transaction_is_left_to_the_caller(conn):
+    open_account(conn, "1000000001")
+    conn.execute("BEGIN IMMEDIATE")
+    removed, _ = AccountRemover(conn).remove_accounts(["1000000001"])
+    assert [row[0] for row in removed] == ["1000000001"]
+    assert conn.in_transaction
+    conn.rollback()
+    assert account_numbers(conn, "accounts") == {"1000000001"}
+    assert account_numbers(conn, "closed_accounts") == set()
+
+
+def test_failed_batch_inside_callers_transaction_keeps_callers_writes(conn):
+    open_account(conn, "1000000001", username="alice")
+    open_account(conn, "1000000002")
+    # A closed account with the same number makes the move fail on its UNIQUE constraint
+    with conn:
+        conn.execute(
+            "INSERT INTO closed_accounts (account_number, username, balance_cents, closed_at) "
+            "VALUES ('1000000002', 'old', 0, '2020-01-01 00:00:00')"
+        )
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("UPDATE accounts SET username='renamed' WHERE account_number='1000000001'")
+    with pytest.raises(sqlite3.IntegrityError):
+        AccountRemover(conn).remove_accounts(["1000000002"])
+    assert conn.in_transaction
+    conn.commit()
+    assert account_numbers(conn, "accounts") == {"1000000001", "1000000002"}
+    assert conn.execute("SELECT username FROM accounts WHERE account_number='1000000001'").fetchone()[0] == "renamed"
@@ -0,0 +1,118 @@
+# test_admin_page.py
+
+import os
+import time
+
+import pytest
+
+pytest.importorskip("customtkinter")
+
+from Admin_Page import DatabaseHandler  # noqa: E402
+from conftest import open_account  # noqa: E402
+from ledger_archive import default_archive_path  # noqa: E402
+
+
+@pytest.fixture
+def handler(db_file):
+    handler = DatabaseHandler(db_file)
+    yield handler
+    handler.close()
+
+
+# Function to wait for a background condition, failing after a few seconds
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_removing_users_archives_their_ledger(handler, db_file):
+    conn = handler.conn
+    account_id = open_account(conn, "1000000001", 500)
+    with conn:
+        conn.execute(
+            "INSERT INTO transactions (account_id, transaction_type, amount_cents, transaction_time) "
+            "VALUES (?, 'Deposit', 500, '2026-01-01 00:00:00')",
+            (account_id,),
+        )
+    assert handler.ledger_archiver is None
+
+    removed, missing = handler.remove_users(["1000000001", "9999999999"])
+    assert [row[0] for row in removed] == ["1000000001"] and missing == ["9999999999"]
+    assert wait_for(lambda: conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 0)
+    assert os.path.exists(default_archive_path(db_file))
+
+
+def test_no_archive_without_removals_or_when_disabled(db_file):
+    handler = DatabaseHandler(db_file, archive_ledger=False)
+    try:
+        open_account(handler.conn, "1000000001")
+        handler.remove_users(["1000000001"])
+        assert handler.ledger_archiver is None
+        assert not os.path.exists(default_archive_path(db_file))
+    finally:
+        handler.close()
+
+
+@pytest.fixture
+def many_users(handler):
+    conn = handler.conn
+    # Repeated usernames and balances, so ties are broken by account number
+    for index in range(60):
+        open_account(conn, f"10000000{index:02d}", (index * 7) % 5 * 100, f"user{index % 4}")
+    return handler
+
+
+@pytest.mark.parametrize("sort_column", ["account_number", "username", "balance_cents"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_keyset_windows_match_the_full_order(many_users, sort_column, descending):
+    handler = many_users
+    everyone = handler.fetch_users(1000, sort_column, descending)
+    assert len(everyone) == 60
+    column = ["account_number", "username", "balance_cents"].index(sort_column)
+
+    def key(row):
+        return (row[column], row[0])
+
+    assert handler.fetch_users(5, sort_column, descending, skip=10) == everyone[10:15]
+    assert handler.fetch_users(5, sort_column, descending, backward=True) == everyone[-5:]
+    assert handler.fetch_users(5, sort_column, descending, backward=True, skip=3) == everyone[-8:-3]
+    # Forward and backward from a row's key, stepping over rows past it
+    assert handler.fetch_users(5, sort_column, descending, seek=key(everyone[20])) == everyone[21:26]
+    assert handler.fetch_users(5, sort_column, descending, seek=key(everyone[20]), skip=4) == everyone[25:30]
+    assert handler.fetch_users(5, sort_column, descending, seek=key(everyone[20]), inclusive=True) == everyone[20:25]
+    assert handler.fetch_users(5, sort_column, descending, seek=key(everyone[20]), backward=True) == everyone[15:20]
+    assert handler.fetch_users(5, sort_column, descending, seek=key(everyone[20]), backward=True, skip=2) == everyone[13:18]
+
+
+def test_keyset_windows_respect_the_search(many_users):
+    handler = many_users
+    matches = handler.fetch_users(100, "username", search="user1")
+    assert len(matches) == 15 and all(row[1] == "user1" for row in matches)
+    key = (matches[4][1], matches[4][0])
+    assert handler.fetch_users(3, "username", search="user1", seek=key) == matches[5:8]
+
+
+def test_user_counts_are_cached_and_follow_removals(many_users):
+    handler = many_users
+    assert handler.count_users() == 60
+    assert handler.count_users("user1") == 15
+    assert handler.count_users("100000001") == 10
+    # Accounts opened behind the handler's back are only seen after forgetting the counts
+    open_account(handler.conn, "2000000000", 0, "user1")
+    assert handler.count_users() == 60
+
+    removed, _ = handler.remove_users(["1000000001", "1000000005", "1000000012"])
+    assert len(removed) == 3
+    assert handler.count_users() == 57
+    assert handler.count_users("user1") == 13
+    assert handler.count_users("100000001") == 9
+    handler.restore_users(["1000000001"])
+    assert handler.count_users("user1") == 14
+
+    handler.forget_user_counts()
+    assert handler.count_users() == 59
+    assert handler.count_users("user1") == 15
@@ -0,0 +1,32 @@
+# test_credentials.py
+
+import pytest
+
+from credentials import CredentialService
+
+
+@pytest.fixture
+def credentials(conn):
+    credentials = CredentialService(rounds=4)
+    credentials.ensure_admin(conn, "admin", "secret")
+    return credentials
+
+
+def test_verify_admin(conn, credentials):
+    assert credentials.verify_admin(conn, "admin", "secret")
+    assert not credentials.verify_admin(conn, "admin", "wrong")
+    assert not credentials.verify_admin(conn, "nobody", "secret")
+
+
+def test_unknown_admin_is_checked_against_the_dummy_hash(conn, credentials, monkeypatch):
+    checked = []
+    original = credentials.check_password
+    monkeypatch.setattr(credentials, "check_password", lambda password, hashed: checked.append(hashed) or original(password, hashed))
+    assert not credentials.verify_admin(conn, "nobody", "secret")
+    assert checked == [None]
+    assert credentials._dummy_hash is not None
+
+
+def test_ensure_admin_only_creates_a_missing_admin(conn, credentials):
+    assert not credentials.ensure_admin(conn, "admin", "other")
+    assert credentials.verify_admin(conn, "admin", "secret")
@@ -0,0 +1,30 @@
+# test_login_throttle.py
+
+from login_throttle import LoginThrottle
+
+
+def test_attempts_without_a_source_are_only_throttled_per_username(conn):
+    throttle = LoginThrottle(lambda: conn, user_capacity=2, source_capacity=2)
+    # Many different users at one terminal are not held up by each other
+    for index in range(10):
+        assert throttle.check(f"user{index}") == 0
+    assert throttle.check("user0") == 0
+    assert throttle.check("user0") > 0
+
+
+def test_attempts_from_one_source_share_its_bucket(conn):
+    throttle = LoginThrottle(lambda: conn, user_capacity=5, source_capacity=2)
+    assert throttle.check("alice", "10.0.0.1") == 0
+    assert throttle.check("bob", "10.0.0.1") == 0
+    assert throttle.check("carol", "10.0.0.1") > 0
+    assert throttle.check("carol", "10.0.0.2") == 0
+
+
+def test_repeated_failures_lock_the_username_out(conn):
+    throttle = LoginThrottle(lambda: conn, lockout_threshold=2)
+    throttle.record_failure("alice")
+    assert throttle.check("alice") == 0
+    throttle.record_failure("alice")
+    assert throttle.check("alice") > 0
+    throttle.record_success("alice")
+    assert throttle.check("alice") == 0
@@ -0,0 +1,58 @@
+# test_money.py
+
+from decimal import Decimal
+
+import pytest
+
+from money import Money, format_cents, parse_rands, to_cents
+
+
+@pytest.mark.parametrize("text, cents", [
+    ("150", 15000),
+    ("150.5", 15050),
+    ("0.01", 1),
+    ("R1 250.75", 125075),
+    ("r99.99", 9999),
+    ("-5.00", -500),
+])
+def test_parse_rands(text, cents):
+    amount = parse_rands(text)
+    assert isinstance(amount, Money)
+    assert amount == cents
+
+
+@pytest.mark.parametrize("text", ["1.005", "abc", "", "nan", "inf", "R"])
+def test_parse_rands_rejects_non_amounts(text):
+    with pytest.raises(ValueError):
+        parse_rands(text)
+
+
+@pytest.mark.parametrize("cents", [0, 1, 9, 10, 99, 100, 101, 123456, 10 ** 15 + 7, -1, -250])
+def test_cents_round_trip_through_text(cents):
+    assert format_cents(cents) == str(Money(cents))
+    assert parse_rands(format_cents(cents)) == cents
+
+
+def test_format_cents():
+    assert format_cents(123456) == "1234.56"
+    assert format_cents(5) == "0.05"
+    assert format_cents(-5) == "-0.05"
+    assert repr(Money(250)) == "Money('2.50')"
+
+
+@pytest.mark.parametrize("rands, cents", [
+    (1, 100),
+    (0.1, 10),
+    (0.285, 29),
+    (2.675, 268),
+    (1234.565, 123457),
+    (-0.005, -1),
+    (Decimal("19.99"), 1999),
+])
+def test_to_cents(rands, cents):
+    assert to_cents(rands) == cents
+
+
+def test_to_cents_round_trips_two_decimal_floats():
+    for cents in range(0, 100001, 7):
+        assert to_cents(cents / 100) == cents
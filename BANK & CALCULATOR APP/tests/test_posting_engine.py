@@ -0,0 +1,128 @@
+# test_posting_engine.py
+
+import threading
+
+import pytest
+
+from conftest import balance_of, ledger_total, open_account
+from db_access import DEFAULT_OPTIONS, get_pool
+from posting_engine import GroupCommitter, PostingEngine
+
+
+def test_post_updates_balance_and_ledger(conn):
+    open_account(conn, "1000000001")
+    engine = PostingEngine(conn)
+    assert engine.post("1000000001", "Deposit", 5000) == 5000
+    assert engine.post("1000000001", "Withdrawal", 1250) == 3750
+    assert balance_of(conn, "1000000001") == ledger_total(conn, "1000000001") == 3750
+
+
+def test_withdrawal_cannot_overdraw(conn):
+    open_account(conn, "1000000001", 1000)
+    engine = PostingEngine(conn)
+    assert engine.post("1000000001", "Withdrawal", 1001) is None
+    assert engine.post("9999999999", "Deposit", 100) is None
+    assert balance_of(conn, "1000000001") == 1000
+    assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 0
+
+
+@pytest.mark.parametrize("amount", [0, -1, -5000])
+def test_non_positive_amounts_are_rejected(conn, amount):
+    open_account(conn, "1000000001", 1000)
+    with pytest.raises(ValueError):
+        PostingEngine(conn).post("1000000001", "Deposit", amount)
+    assert balance_of(conn, "1000000001") == 1000
+
+
+@pytest.mark.parametrize("amount", [10.5, "100", True, None])
+def test_non_integer_amounts_are_rejected(conn, amount):
+    open_account(conn, "1000000001")
+    with pytest.raises(TypeError):
+        PostingEngine(conn).post("1000000001", "Deposit", amount)
+
+
+@pytest.mark.parametrize("transaction_type", ["deposit", "Refund", "", None])
+def test_unknown_transaction_types_are_rejected(conn, transaction_type):
+    open_account(conn, "1000000001", 1000)
+    with pytest.raises(ValueError):
+        PostingEngine(conn).post("1000000001", transaction_type, 100)
+    assert balance_of(conn, "1000000001") == 1000
+
+
+def test_a_bad_posting_rejects_the_whole_batch_before_writing(conn):
+    open_account(conn, "1000000001")
+    with pytest.raises(ValueError):
+        PostingEngine(conn).post_batch([("1000000001", "Deposit", 100), ("1000000001", "Deposit", -100)])
+    assert balance_of(conn, "1000000001") == 0
+    assert not conn.in_transaction
+
+
+def test_batch_inside_callers_transaction_is_left_to_the_caller(conn):
+    open_account(conn, "1000000001")
+    conn.execute("BEGIN IMMEDIATE")
+    assert PostingEngine(conn).post_batch([("1000000001", "Deposit", 100)]) == [100]
+    assert conn.in_transaction
+    conn.rollback()
+    assert balance_of(conn, "1000000001") == 0
+
+
+# Many threads, each on its own connection, race to withdraw from one account. The
+# conditional update must let exactly as many through as the balance covers.
+def test_concurrent_withdrawals_lose_no_updates(db_file, conn):
+    # One connection fewer than the pool holds, since this thread keeps one too
+    threads_count = DEFAULT_OPTIONS["max_connections"] - 1
+    attempts, amount = 40, 100
+    funded = 150
+    open_account(conn, "1000000001", funded * amount)
+    succeeded = []
+    errors = []
+    start = threading.Barrier(threads_count, timeout=30)
+
+    def withdraw():
+        pool = get_pool(db_file)
+        try:
+            engine = PostingEngine(pool.connection())
+            start.wait()
+            for _ in range(attempts):
+                if engine.post("1000000001", "Withdrawal", amount) is not None:
+                    succeeded.append(1)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            pool.release()
+
+    threads = [threading.Thread(target=withdraw) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(succeeded) == funded
+    assert balance_of(conn, "1000000001") == 0
+    assert ledger_total(conn, "1000000001") == -funded * amount
+
+
+def test_concurrent_deposits_through_group_commit(db_file, conn):
+    open_account(conn, "1000000001")
+    committer = GroupCommitter(db_file)
+    futures = []
+    lock = threading.Lock()
+
+    def deposit():
+        for _ in range(50):
+            future = committer.submit("1000000001", "Deposit", 10)
+            with lock:
+                futures.append(future)
+
+    threads = [threading.Thread(target=deposit) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    committer.close()
+
+    assert all(future.result(timeout=5) is not None for future in futures)
+    assert balance_of(conn, "1000000001") == ledger_total(conn, "1000000001") == 300 * 10
+    with pytest.raises(RuntimeError):
+        committer.submit("1000000001", "Deposit", 10)
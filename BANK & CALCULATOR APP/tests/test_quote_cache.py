@@ -0,0 +1,41 @@
+# test_quote_cache.py
+
+from quote_cache import QuoteCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_equal_inputs_share_one_quote():
+    cache = QuoteCache()
+    calls = []
+
+    def compute(principal, rate, kind):
+        calls.append((principal, rate, kind))
+        return principal * rate
+
+    assert cache.quote("invest", compute, 250000, 7.5, "Compound ") == 1875000
+    assert cache.quote("invest", compute, 250000.0000001, 7.5, "compound") == 1875000
+    # A different rate is a different quote
+    cache.quote("invest", compute, 250000, 8.0, "compound")
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_entries_expire_and_the_least_recently_used_is_evicted():
+    clock = Clock()
+    cache = QuoteCache(max_entries=2, ttl=10, clock=clock)
+    cache.quote("bond", lambda x: x, 1)
+    cache.quote("bond", lambda x: x, 2)
+    cache.quote("bond", lambda x: x, 1)
+    cache.quote("bond", lambda x: x, 3)
+    assert set(key[1] for key in cache.entries) == {1, 3}
+    clock.now = 11
+    cache.quote("bond", lambda x: x, 1)
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["expirations"] == 1
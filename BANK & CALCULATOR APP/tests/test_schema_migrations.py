@@ -0,0 +1,52 @@
+# test_schema_migrations.py
+
+import shutil
+import sqlite3
+
+from conftest import APP_DIR
+from schema_migrations import MIGRATIONS, get_schema_version, migrate
+
+
+# The bankapp.db shipped with the app still has the pre-migration schema and REAL rands
+def test_baseline_database_migrates_to_latest(tmp_path):
+    path = tmp_path / "bankapp.db"
+    shutil.copy(f"{APP_DIR}/bankapp.db", path)
+    conn = sqlite3.connect(str(path))
+    try:
+        legacy_accounts = conn.execute("SELECT COUNT(*), SUM(balance) FROM accounts").fetchone()
+        legacy_users = conn.execute("SELECT COUNT(*), SUM(balance) FROM users").fetchone()
+        legacy_transactions = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        assert get_schema_version(conn) == 0
+
+        assert migrate(conn) == [version for version, _, _ in MIGRATIONS]
+
+        assert get_schema_version(conn) == MIGRATIONS[-1][0] == 13
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(accounts)")}
+        assert "balance_cents" in columns and "balance" not in columns
+        # Users and accounts are merged, with every rand carried over as whole cents
+        count, total_cents = conn.execute("SELECT COUNT(*), SUM(balance_cents) FROM accounts").fetchone()
+        assert count == legacy_accounts[0] + legacy_users[0]
+        assert total_cents == round((legacy_accounts[1] + legacy_users[1]) * 100)
+        # Ledger rows that match no account are set aside, not lost
+        migrated = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        unmatched = conn.execute("SELECT COUNT(*) FROM legacy_unmatched_transactions").fetchone()[0]
+        assert migrated + unmatched == legacy_transactions
+    finally:
+        conn.close()
+
+
+def test_migrate_is_idempotent(conn):
+    version = get_schema_version(conn)
+    assert migrate(conn) == []
+    assert get_schema_version(conn) == version
+    assert not conn.in_transaction
+
+
+def test_migrate_prints_nothing(db_file, capsys):
+    conn = sqlite3.connect(db_file)
+    try:
+        assert migrate(conn)
+    finally:
+        conn.close()
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,43 @@
+# test_sessions.py
+
+import os
+import stat
+import sys
+
+import pytest
+
+from sessions import SessionManager, default_secret_path
+
+
+@pytest.fixture(autouse=True)
+def no_configured_secret(monkeypatch):
+    monkeypatch.delenv("BANKAPP_SESSION_SECRET", raising=False)
+
+
+def test_generated_secret_lives_in_a_private_file_not_the_database(conn, db_file):
+    sessions = SessionManager(lambda: conn)
+    token = sessions.issue("alice")
+    secret_file = default_secret_path(db_file)
+    assert os.path.exists(secret_file)
+    if sys.platform != "win32":
+        assert stat.S_IMODE(os.stat(secret_file).st_mode) == 0o600
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name='app_secrets'").fetchone()[0] == 0
+    # Another process opening the same database signs with the same key
+    assert SessionManager(lambda: conn).verify(token)["sub"] == "alice"
+
+
+def test_configured_secret_is_used_instead_of_a_file(conn, db_file, monkeypatch):
+    monkeypatch.setenv("BANKAPP_SESSION_SECRET", "configured")
+    token = SessionManager(lambda: conn).issue("alice")
+    assert not os.path.exists(default_secret_path(db_file))
+    assert SessionManager(lambda: conn, secret="configured").verify(token)["sub"] == "alice"
+    assert SessionManager(lambda: conn, secret="other").verify(token) is None
+
+
+def test_revoked_and_wrong_role_tokens_are_refused(conn):
+    sessions = SessionManager(lambda: conn)
+    token = sessions.issue("admin", role="admin")
+    assert sessions.verify(token, role="user") is None
+    assert sessions.verify(token, role="admin")["sub"] == "admin"
+    sessions.revoke(token)
+    assert sessions.verify(token) is None
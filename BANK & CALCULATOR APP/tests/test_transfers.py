@@ -0,0 +1,125 @@
+# test_transfers.py
+
+import pytest
+
+from account_removal import AccountRemover
+from conftest import balance_of, ledger_total, open_account
+from posting_engine import TRANSFER_IN, TRANSFER_OUT
+from transfers import TransferEngine
+
+
+@pytest.fixture
+def accounts(conn):
+    open_account(conn, "1000000001", 10000)
+    open_account(conn, "1000000002", 500)
+    return conn
+
+
+def count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_transfer_moves_money_and_records_both_legs(accounts):
+    conn = accounts
+    assert TransferEngine(conn).transfer("1000000001", "1000000002", 2500, "key-1") == (7500, 3000, False)
+    assert balance_of(conn, "1000000001") == 7500
+    assert balance_of(conn, "1000000002") == 3000
+    types = [row[0] for row in conn.execute("SELECT transaction_type FROM transactions ORDER BY id")]
+    assert types == [TRANSFER_OUT, TRANSFER_IN]
+    assert count(conn, "transfers") == 1
+
+
+def test_failed_transfer_changes_nothing(accounts):
+    conn = accounts
+    engine = TransferEngine(conn)
+    assert engine.transfer("1000000002", "1000000001", 501, "key-1") is None
+    assert engine.transfer("1000000001", "9999999999", 100, "key-2") is None
+    assert balance_of(conn, "1000000001") == 10000
+    assert balance_of(conn, "1000000002") == 500
+    assert count(conn, "transactions") == 0
+    assert count(conn, "transfers") == 0
+    # A failed key is not recorded, so it can be retried once there is money
+    assert engine.transfer("1000000001", "1000000002", 100, "key-1") == (9900, 600, False)
+
+
+@pytest.mark.parametrize("amount", [0, -100])
+def test_non_positive_transfers_are_rejected(accounts, amount):
+    with pytest.raises(ValueError):
+        TransferEngine(accounts).transfer("1000000001", "1000000002", amount)
+
+
+def test_transfer_to_same_account_is_rejected(accounts):
+    with pytest.raises(ValueError):
+        TransferEngine(accounts).transfer("1000000001", "1000000001", 100)
+
+
+def test_replayed_key_returns_original_result_without_moving_money(accounts):
+    conn = accounts
+    engine = TransferEngine(conn)
+    first = engine.transfer("1000000001", "1000000002", 2500, "key-1")
+    engine.transfer("1000000002", "1000000001", 100, "key-2")
+    assert engine.transfer("1000000001", "1000000002", 2500, "key-1") == first[:2] + (True,)
+    assert balance_of(conn, "1000000001") == 7600
+    assert balance_of(conn, "1000000002") == 2900
+    assert count(conn, "transfers") == 2
+    assert count(conn, "transactions") == 4
+
+
+def test_key_conflict_rolls_back_the_whole_batch(accounts):
+    conn = accounts
+    engine = TransferEngine(conn)
+    engine.transfer("1000000001", "1000000002", 100, "key-1")
+    with pytest.raises(ValueError):
+        engine.transfer_batch([
+            ("1000000001", "1000000002", 300, "key-2"),
+            ("1000000001", "1000000002", 999, "key-1"),
+        ])
+    assert not conn.in_transaction
+    assert balance_of(conn, "1000000001") == 9900
+    assert balance_of(conn, "1000000002") == 600
+    assert conn.execute("SELECT COUNT(*) FROM transfers WHERE idempotency_key='key-2'").fetchone()[0] == 0
+
+
+def test_key_conflict_inside_callers_transaction_keeps_callers_writes(accounts):
+    conn = accounts
+    engine = TransferEngine(conn)
+    engine.transfer("1000000001", "1000000002", 100, "key-1")
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("UPDATE accounts SET username='renamed' WHERE account_number='1000000002'")
+    with pytest.raises(ValueError):
+        engine.transfer_batch([
+            ("1000000002", "1000000001", 50, "key-2"),
+            ("1000000001", "1000000002", 999, "key-1"),
+        ])
+    assert conn.in_transaction
+    conn.commit()
+    assert conn.execute("SELECT username FROM accounts WHERE account_number='1000000002'").fetchone()[0] == "renamed"
+    assert balance_of(conn, "1000000002") == 600
+
+
+def test_batch_applies_each_transfer_independently(accounts):
+    conn = accounts
+    results = TransferEngine(conn).transfer_batch([
+        ("1000000002", "1000000001", 400, None),
+        ("1000000002", "1000000001", 400, None),
+        ("1000000001", "1000000002", 1000, None),
+    ])
+    assert [result and result[:2] for result in results] == [(100, 10400), None, (9400, 1100)]
+    # Money is conserved and each ledger agrees with its balance
+    assert balance_of(conn, "1000000001") + balance_of(conn, "1000000002") == 10500
+    for account_number in ("1000000001", "1000000002"):
+        assert balance_of(conn, account_number) == ledger_total(conn, account_number) + (
+            10000 if account_number == "1000000001" else 500
+        )
+
+
+def test_replay_after_an_account_is_closed_returns_recorded_result(accounts):
+    conn = accounts
+    engine = TransferEngine(conn)
+    first = engine.transfer("1000000001", "1000000002", 2500, "key-1")
+    AccountRemover(conn).remove_accounts(["1000000002"])
+    assert engine.transfer("1000000001", "1000000002", 2500, "key-1") == first[:2] + (True,)
+    # A different transfer under the same key is still refused
+    with pytest.raises(ValueError):
+        engine.transfer("1000000001", "1000000002", 2600, "key-1")
+    assert balance_of(conn, "1000000001") == 7500
@@ -0,0 +1,77 @@
+# transaction_history.py
+
+from ledger_archive import UNIFIED_VIEW, attach_archive
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class TransactionHistory:
+    # Lazily pages through one account's ledger in (transaction_time, id) order.
+    # Each page resumes after the last row of the previous one (keyset pagination), so
+    # every page costs the same index seek no matter how deep into the history it is.
+    # With include_archived, rows already moved to the archive database (if there is one)
+    # are included.
+    def __init__(self, conn, account_id, page_size=DEFAULT_PAGE_SIZE,
+                 start_time=None, end_time=None, transaction_types=None, include_archived=False):
+        if page_size <= 0:
+            raise ValueError("Page size must be a positive number")
+        self.conn = conn
+        self.account_id = account_id
+        self.page_size = page_size
+        self.start_time = start_time
+        self.end_time = end_time
+        self.transaction_types = tuple(transaction_types) if transaction_types else ()
+        self.table = "transactions"
+        if include_archived:
+            attach_archive(conn, create=False)
+            self.table = UNIFIED_VIEW
+
+    # Function to fetch the page that follows the given (transaction_time, id) cursor
+    def fetch_page(self, after=None):
+        conditions = ["account_id = ?"]
+        params = [self.account_id]
+        if after is not None:
+            conditions.append("(transaction_time, id) > (?, ?)")
+            params.extend(after)
+        if self.start_time is not None:
+            conditions.append("transaction_time >= ?")
+            params.append(self.start_time)
+        if self.end_time is not None:
+            conditions.append("transaction_time < ?")
+            params.append(self.end_time)
+        if self.transaction_types:
+            conditions.append(f"transaction_type IN ({', '.join('?' for _ in self.transaction_types)})")
+            params.extend(self.transaction_types)
+        params.append(self.page_size)
+
+        # A fresh cursor per page lets callers run other queries between pages
+        rows = self.conn.cursor().execute(
+            f"SELECT id, transaction_type, amount_cents, transaction_time FROM {self.table} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY transaction_time, id LIMIT ?",
+            params,
+        ).fetchall()
+        return [
+            {
+                "id": row[0],
+                "transaction_type": row[1],
+                "amount_cents": row[2],
+                "transaction_time": row[3],
+            }
+            for row in rows
+        ]
+
+    # Function to yield the history one page (list of transaction dicts) at a time
+    def pages(self):
+        after = None
+        while True:
+            page = self.fetch_page(after)
+            if not page:
+                return
+            yield page
+            if len(page) < self.page_size:
+                return
+            after = (page[-1]["transaction_time"], page[-1]["id"])
+
+    def __iter__(self):
+        for page in self.pages():
+            yield from page
@@ -0,0 +1,130 @@
+# transfers.py
+
+import sqlite3
+from datetime import datetime
+
+from posting_engine import TRANSFER_IN, TRANSFER_OUT, check_amount
+
+# Changes a balance only if it holds at least the given cents, so a debit cannot overdraw it
+UPDATE_BALANCE_SQL = (
+    "UPDATE accounts SET balance_cents = balance_cents + ? WHERE id=? AND balance_cents >= ? "
+    "RETURNING balance_cents"
+)
+INSERT_LEDGER_SQL = (
+    "INSERT INTO transactions (account_id, transaction_type, amount_cents, transaction_time) VALUES (?, ?, ?, ?)"
+)
+
+
+class TransferEngine:
+    # Moves money between two accounts in one database transaction: the debit, the credit,
+    # both ledger rows and the transfers record commit together, so money is never out of
+    # one account without being in the other. Balances are updated in account id order,
+    # so every transfer takes its row locks in the same order whichever way the money
+    # flows. (SQLite locks the whole file, but the order keeps this safe on engines with
+    # row locks too.)
+    #
+    # Every transfer has an idempotency key, kept in the transfers table. Retrying with a
+    # key that already succeeded returns the original result, flagged as a replay, without
+    # moving money again.
+    # Transfers that fail (missing account, insufficient funds) are not recorded, so a
+    # retry with the same key is tried afresh.
+    def __init__(self, conn):
+        self.conn = conn
+
+    # Function to transfer amount cents between two accounts.
+    # Returns (new from balance, new to balance, replayed) with balances in cents, or None
+    # if either account is missing or the source has insufficient funds. replayed is True
+    # when the key had already been used for this transfer: nothing moved this time, and
+    # the balances are the ones recorded when it first went through.
+    def transfer(self, from_account_number, to_account_number, amount, idempotency_key=None):
+        return self.transfer_batch([(from_account_number, to_account_number, amount, idempotency_key)])[0]
+
+    # Function to apply many (from account, to account, amount, idempotency key) transfers
+    # under a single commit, e.g. a payroll run paying out from one account. A missing
+    # account or insufficient funds fails just that transfer; the returned list holds a
+    # result (see transfer) for every transfer, in input order. Invalid input, or an
+    # idempotency key reused for a different transfer, raises ValueError and rolls back
+    # the whole batch. Inside a transaction the caller already has open, the transfers
+    # join it and are left for the caller to commit.
+    def transfer_batch(self, transfers):
+        # Checked before the write lock is taken
+        for from_account_number, to_account_number, amount, _ in transfers:
+            check_amount(amount)
+            if amount <= 0:
+                raise ValueError("Transfer amounts must be positive")
+            if from_account_number == to_account_number:
+                raise ValueError("Cannot transfer to the same account")
+        if not all(transfer[3] for transfer in transfers):
+            # Imported here: only callers that do not bring their own keys need uuid
+            import uuid
+            transfers = [transfer if transfer[3] else transfer[:3] + (uuid.uuid4().hex,) for transfer in transfers]
+        transaction_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        started = not self.conn.in_transaction
+        cursor = self.conn.cursor()
+        try:
+            # In the caller's transaction, a savepoint lets a failure undo just this batch
+            cursor.execute("BEGIN IMMEDIATE" if started else "SAVEPOINT transfer_batch")
+            results = [
+                self._transfer(cursor, from_account_number, to_account_number, amount, idempotency_key, transaction_time)
+                for from_account_number, to_account_number, amount, idempotency_key in transfers
+            ]
+            if started:
+                self.conn.commit()
+            else:
+                cursor.execute("RELEASE transfer_batch")
+            return results
+        except (sqlite3.Error, ValueError):
+            if started:
+                self.conn.rollback()
+            else:
+                cursor.execute("ROLLBACK TO transfer_batch")
+                cursor.execute("RELEASE transfer_batch")
+            raise
+
+    def _transfer(self, cursor, from_account_number, to_account_number, amount, idempotency_key, transaction_time):
+        # A key that already went through is checked first, against the account numbers it
+        # was recorded with: either account may have been closed since (closing keeps the id)
+        done = cursor.execute(
+            "SELECT (SELECT account_number FROM accounts WHERE id = t.from_account_id "
+            "UNION ALL SELECT account_number FROM closed_accounts WHERE id = t.from_account_id), "
+            "(SELECT account_number FROM accounts WHERE id = t.to_account_id "
+            "UNION ALL SELECT account_number FROM closed_accounts WHERE id = t.to_account_id), "
+            "amount_cents, from_balance_cents, to_balance_cents FROM transfers t WHERE idempotency_key=?",
+            (idempotency_key,),
+        ).fetchone()
+        if done is not None:
+            if (done[0], done[1], done[2]) != (from_account_number, to_account_number, amount):
+                raise ValueError(f"Idempotency key {idempotency_key!r} was already used for a different transfer")
+            return done[3], done[4], True
+
+        account_ids = dict(cursor.execute(
+            "SELECT account_number, id FROM accounts WHERE account_number IN (?, ?)",
+            (from_account_number, to_account_number),
+        ).fetchall())
+        from_id = account_ids.get(from_account_number)
+        to_id = account_ids.get(to_account_number)
+        if from_id is None or to_id is None:
+            return None
+
+        # A savepoint, so a failed debit also undoes a credit that was applied before it
+        cursor.execute("SAVEPOINT transfer")
+        balances = {}
+        for account_id, delta, minimum_balance in sorted(((from_id, -amount, amount), (to_id, amount, 0))):
+            row = cursor.execute(UPDATE_BALANCE_SQL, (delta, account_id, minimum_balance)).fetchone()
+            if row is None:
+                cursor.execute("ROLLBACK TO transfer")
+                cursor.execute("RELEASE transfer")
+                return None
+            balances[account_id] = row[0]
+
+        debit_id = cursor.execute(INSERT_LEDGER_SQL, (from_id, TRANSFER_OUT, amount, transaction_time)).lastrowid
+        credit_id = cursor.execute(INSERT_LEDGER_SQL, (to_id, TRANSFER_IN, amount, transaction_time)).lastrowid
+        cursor.execute(
+            "INSERT INTO transfers (idempotency_key, from_account_id, to_account_id, amount_cents, "
+            "from_balance_cents, to_balance_cents, debit_transaction_id, credit_transaction_id, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (idempotency_key, from_id, to_id, amount, balances[from_id], balances[to_id],
+             debit_id, credit_id, transaction_time),
+        )
+        cursor.execute("RELEASE transfer")
+        return balances[from_id], balances[to_id], False
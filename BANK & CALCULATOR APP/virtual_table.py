@@ -0,0 +1,183 @@
+# virtual_table.py
+
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTable(tk.Frame):
+    # A table that only ever holds the rows on screen. The scrollbar is driven by a row
+    # count, and each scroll asks fetch_rows for just the visible window, so the widget
+    # costs the same for 100 rows or 200k rows. Windows are found by keyset: fetch_rows(
+    # limit, sort_column, descending, seek=, backward=, skip=, inclusive=) seeks from the
+    # key (sort value, key_column value) of a row already on screen, or from either end of
+    # the list, whichever steps over the fewest rows. Clicking a heading sorts by that
+    # column (again to reverse); sorting is done by whatever fetch_rows queries, not here.
+    def __init__(self, master, columns, count_rows, fetch_rows, visible_rows=12,
+                 sort_column=None, key_column=None, formatters=None, **kwargs):
+        super().__init__(master, **kwargs)
+        # columns is a list of (key, heading, width)
+        self.columns = columns
+        self.count_rows = count_rows
+        self.fetch_rows = fetch_rows
+        self.visible_rows = visible_rows
+        self.sort_column = sort_column or columns[0][0]
+        # A column whose values are unique, breaking ties between equal sort values
+        self.key_column = key_column or columns[0][0]
+        self.descending = False
+        self.formatters = formatters or {}
+        self.total = 0
+        # Position of the first row on screen, and where the next render scrolls to
+        self.offset = 0
+        self.target = 0
+        self.render_pending = False
+        # The rows on screen in order, and by item id, as fetched (Tk would turn "0123" into 123)
+        self.window = []
+        self.rows = {}
+
+        self.tree = ttk.Treeview(
+            self, columns=[key for key, _, _ in columns], show="headings",
+            height=visible_rows, selectmode="browse",
+        )
+        for key, heading, width in columns:
+            self.tree.heading(key, text=heading, command=lambda key=key: self.sort_by(key))
+            self.tree.column(key, width=width, stretch=True)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_rows(3))
+        self.tree.bind("<Up>", lambda event: self.on_arrow_key(-1))
+        self.tree.bind("<Down>", lambda event: self.on_arrow_key(1))
+        self.tree.bind("<Prior>", lambda event: self.scroll_rows(-self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self.scroll_rows(self.visible_rows))
+
+    # Function to re-count the rows and re-fetch the visible window, e.g. after a search
+    # or a removal. The scroll position is kept unless reset is True.
+    def refresh(self, reset=False):
+        self.total = self.count_rows()
+        if reset:
+            self.window = []
+            self.offset = 0
+        self.show(self.clamp(self.offset), refetch=True)
+
+    # Function to sort by a column; choosing the current column again reverses the order
+    def sort_by(self, key):
+        if key == self.sort_column:
+            self.descending = not self.descending
+        else:
+            self.sort_column = key
+            self.descending = False
+        for column_key, heading, _ in self.columns:
+            arrow = (" ▼" if self.descending else " ▲") if column_key == self.sort_column else ""
+            self.tree.heading(column_key, text=heading + arrow)
+        self.window = []
+        self.show(0)
+
+    # Function to return the values of the selected row, or None
+    def selected_row(self):
+        selection = self.tree.selection()
+        if not selection:
+            return None
+        return self.rows.get(selection[0])
+
+    def clamp(self, offset):
+        return max(0, min(offset, self.total - self.visible_rows))
+
+    def scroll_rows(self, rows):
+        self.scroll_to(self.target + rows)
+        return "break"
+
+    def scroll_to(self, offset):
+        offset = self.clamp(offset)
+        if offset != self.target:
+            self.target = offset
+            self.schedule_render()
+
+    # Fast scrolling produces many events; they are folded into one fetch per idle moment
+    def schedule_render(self):
+        if not self.render_pending:
+            self.render_pending = True
+            self.after_idle(self.render)
+
+    def render(self):
+        self.render_pending = False
+        if self.target != self.offset:
+            self.show(self.target)
+
+    def key_of(self, row):
+        keys = [key for key, _, _ in self.columns]
+        return (row[keys.index(self.sort_column)], row[keys.index(self.key_column)])
+
+    # Function to fetch the window starting at row position target. Each way of getting
+    # there costs the rows it steps over: from the first row, from the last row, or from
+    # the nearest row on screen; the cheapest is used.
+    def fetch_window(self, target, refetch=False):
+        limit = self.visible_rows
+        if refetch and self.window and target == self.offset:
+            # Same place: start again from the first row on screen (or the next one along,
+            # if that row is gone)
+            return self.fetch_rows(limit, self.sort_column, self.descending,
+                                   seek=self.key_of(self.window[0]), inclusive=True)
+        options = [(target, {}), (max(0, self.total - target - limit), {"backward": True})]
+        # After a refetch the rows on screen may no longer be where they were
+        window = [] if refetch else self.window
+        last = self.offset + len(window) - 1
+        if window and target > self.offset:
+            anchor = min(target - 1, last)
+            options.append((target - 1 - anchor, {"seek": self.key_of(window[anchor - self.offset])}))
+        elif window and target < self.offset:
+            anchor = max(target + limit, self.offset)
+            if anchor <= last:
+                options.append((anchor - target - limit, {"seek": self.key_of(window[anchor - self.offset]), "backward": True}))
+        skip, seek = min(options, key=lambda option: option[0])
+        return self.fetch_rows(limit, self.sort_column, self.descending, skip=skip, **seek)
+
+    # Function to fetch and draw the window starting at row position target
+    def show(self, target, refetch=False):
+        rows = self.fetch_window(target, refetch)
+        self.offset = self.target = target
+        self.window = rows
+        self.tree.delete(*self.tree.get_children())
+        self.rows = {}
+        for index, row in enumerate(rows):
+            values = [
+                self.formatters[key](value) if key in self.formatters else value
+                for (key, _, _), value in zip(self.columns, row)
+            ]
+            self.rows[str(self.offset + index)] = row
+            self.tree.insert("", "end", iid=str(self.offset + index), values=values)
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, min(1.0, (self.offset + self.visible_rows) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * self.total))
+        elif action == "scroll":
+            amount, unit = int(args[0]), args[1]
+            self.scroll_rows(amount * self.visible_rows if unit == "pages" else amount)
+
+    def on_mouse_wheel(self, event):
+        return self.scroll_rows(-3 if event.delta > 0 else 3)
+
+    # Arrow keys move the selection, scrolling the window when it reaches an edge
+    def on_arrow_key(self, step):
+        selection = self.tree.selection()
+        if selection:
+            target = int(selection[0]) + step
+        else:
+            target = self.offset
+        if not 0 <= target < self.total:
+            return "break"
+        if target < self.offset or target >= self.offset + self.visible_rows:
+            self.show(self.clamp(target - (0 if step < 0 else self.visible_rows - 1)))
+        if self.tree.exists(str(target)):
+            self.tree.selection_set(str(target))
+            self.tree.see(str(target))
+        return "break"